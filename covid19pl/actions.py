@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "23rd December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import importlib
+import logging
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+Target = Union[Callable[..., Any], str]
+
+
+def _resolve(target:Target) -> Callable[..., Any]:
+    """ Return callable given directly or as 'module:function' name """
+    if callable(target):
+        return target
+    module, name = target.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _run_action(target:Target, args:tuple) -> Tuple[float, Optional[str]]:
+    """ Run action, return its run time and traceback if it failed """
+    start = time.perf_counter()
+    try:
+        _resolve(target)(*args)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return time.perf_counter() - start, error
+
+
+class ActionScheduler(object):
+    """ Runs independent actions on loaded data concurrently.
+
+    Every action runs in a mode fitting its work: 'process' for CPU bound
+    actions, 'thread' for I/O bound ones and 'inline' in the calling thread,
+    for actions writing on the console. Process actions may be given as
+    'module:function' names, so the module is imported only by the worker
+    process. Processes are started before any thread. Every action is timed
+    and its failure is reported separately, other actions are not stopped.
+    """
+
+    MODES = ["process", "thread", "inline"]
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._actions: List[Tuple[str, str, Target, tuple]] = []
+        # Run time and traceback, if failed, of every finished action
+        self.results: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def add(self, name:str, mode:str, target:Target, *args:Any) -> None:
+        """ Schedule call of target with given arguments """
+        if mode not in self.MODES:
+            raise ValueError("Unknown mode '%s' of action %s" % (mode, name))
+        self._actions.append((name, mode, target, args))
+
+    def _report(self, name:str, elapsed:float, error:Optional[str]) -> None:
+        self.results[name] = (elapsed, error)
+        if error is None:
+            self.logger.info("Action %s finished in %.3f s" % (name, elapsed))
+        else:
+            self.logger.error("Action %s failed after %.3f s\n%s" %\
+                              (name, elapsed, error.rstrip()))
+
+    def run(self) -> bool:
+        """ Run all scheduled actions, return True if none of them failed """
+        # Imported here, runs without actions don't pay for it
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        futures: Dict[str, Tuple[Any, float]] = {}
+        executors = []
+        # Every process action has its own worker, so a crashed worker
+        # breaks only its own action
+        for name, mode, target, args in self._actions:
+            if mode == "process":
+                executors.append(ProcessPoolExecutor(max_workers=1))
+                futures[name] = (executors[-1].submit(_run_action,
+                                                      target, args),
+                                 time.perf_counter())
+        threads = [ a for a in self._actions if a[1] == "thread" ]
+        if threads:
+            executors.append(ThreadPoolExecutor(max_workers=len(threads)))
+            for name, _, target, args in threads:
+                futures[name] = (executors[-1].submit(_run_action,
+                                                      target, args),
+                                 time.perf_counter())
+        for name, mode, target, args in self._actions:
+            if mode == "inline":
+                self._report(name, *_run_action(target, args))
+        for name, (future, start) in futures.items():
+            try:
+                self._report(name, *future.result())
+            except Exception:
+                # Worker process died, action did not report its time
+                self._report(name, time.perf_counter() - start,
+                             traceback.format_exc())
+        for executor in executors:
+            executor.shutdown()
+        self._actions = []
+        return all(error is None for _, error in self.results.values())
@@ -13,14 +13,16 @@ __status__      = "Development"
 import logging
 import optparse
 import os
+import sys
 
-from crawler import Covid19DataCrawler
+from actions import ActionScheduler
 import datetime
-from entities import LocationEntity, LocationsLibrary
-from history import Covid19HistoryContainer
-import plot
+from serializers import SNAPSHOT_FORMATS
 import utils
 from __version__ import __version__
+# Modules used only by some of the options, crawler with BeautifulSoup,
+# history with pandas and plot with matplotlib, are imported where they are
+# needed, see scripts/bench_startup.py
 
 
 DATE_FORMAT = "%Y-%m-%d"
@@ -44,6 +46,10 @@ def parse_options():
                                     epilog = "{}, {}".format(__copyright__,
                                                              __license__))
     group = optparse.OptionGroup(parser, "OPTIONAL OPTIONS")
+    group.add_option(  "--backfill", action="store", dest="backfill",
+                        metavar="FROM..TO",
+                        help="Fetch archived data of days missing in "\
+                             "workspace, dates as YYYY-MM-DD")
     group.add_option(  "--debug", action="store_true", dest="debug",
                         help="Run script in debug mode")
     group.add_option(  "--display", action="store_true", dest="display",
@@ -57,13 +63,37 @@ def parse_options():
                                     os.path.dirname(os.path.abspath(__file__)),
                                     ".env"),
                         help="path to file with variables [default: %default]")
+    group.add_option(  "--force_plot", action="store_true", dest="force_plot",
+                        help="Render plots even if their data did not change")
+    group.add_option(  "--format", action="store", type="choice",
+                        choices=list(SNAPSHOT_FORMATS), dest="fmt",
+                        default="json",
+                        help="format of saved data files, json or gzip "\
+                             "compressed jsonz [default: %default]")
+    group.add_option(  "--from_store", action="store_true", dest="from_store",
+                        help="Load data saved in binary store by previous run")
     group.add_option(  "--gather", action="store_true", dest="gather",
                         help="Gather latest data from gov.pl")
+    group.add_option(  "--jobs", action="store", type="int", dest="jobs",
+                        default=1,
+                        help="number of processes decoding data files "\
+                             "[default: %default]")
+    group.add_option(  "--no_cache", action="store_true", dest="no_cache",
+                        help="Skip caches, download whole gov.pl page, "\
+                             "decode all data files and render all plots")
     group.add_option(  "--plot", action="store_true", dest="plot",
                         help="Create a plots from gathered data")
     group.add_option(  "--plot_from_date", action="store", dest="plot_from_date",
                         help="Create a plots starting from date YYYY-MM-DD",
                         default="2020-03-03")
+    # Same as plot.PLOT_MODES, plot module imports matplotlib
+    group.add_option(  "--plot_mode", action="store", type="choice",
+                        choices=["auto", "daily", "compact"], dest="plot_mode",
+                        default="auto",
+                        help="label every day on plots, or tick weeks or "\
+                             "months and downsample long series in compact "\
+                             "plots, auto is compact above 180 days "\
+                             "[default: %default]")
     group.add_option(  "--save_csv", action="store_true", dest="save_csv",
                         help="Save collected data in UTF-8 CSV file")
     group.add_option(  "--workspace", action="store",
@@ -77,6 +107,16 @@ def parse_options():
     if not options.workspace or not os.path.isdir(options.workspace):
         parser.error("Data directory does not exist or was not provided.\n\n"\
                      "See --help for more details.")
+    if options.backfill:
+        try:
+            options.backfill = [ datetime.datetime.strptime(d, DATE_FORMAT)\
+                                                  .date()
+                                 for d in options.backfill.split("..") ]
+            if len(options.backfill) != 2:
+                raise ValueError("Two dates expected")
+        except ValueError:
+            parser.error("Backfill range must be given as FROM..TO, "\
+                         "with dates in YYYY-MM-DD format.")
     return options
 # ------------------------------------------------------------------------------
 
@@ -97,45 +137,103 @@ if __name__ == "__main__":
                          (options.env,) )
         utils.load_env_variables( options.env)
 
+    if options.gather or options.backfill:
+        from crawler import Covid19DataCrawler
+
     if options.gather:
         # Gather latest data from www.gov.pl
-        covid19_web_crawler = Covid19DataCrawler()
+        covid19_web_crawler = Covid19DataCrawler(
+                                cache_dir=None if options.no_cache\
+                                          else options.workspace,
+                                fmt=options.fmt)
         covid19_web_crawler.save_data_in_file( options.workspace )
 
-    # Load data and prepare it for further analysis
-    covid19_history = Covid19HistoryContainer()
-    covid19_history.load_data_from_files( options.workspace )
+    if options.backfill:
+        # Fetch days missing in workspace from web archive
+        covid19_web_crawler = Covid19DataCrawler(fmt=options.fmt)
+        covid19_web_crawler.backfill( *options.backfill,
+                                      save_dir=options.workspace )
+
+    # Plots need data only since the first plotted day, and days before it
+    # their indicators are computed from, and summary only the latest days,
+    # unless whole history is saved in CSV files
+    date_from = None
+    if options.plot:
+        from indicators import PLOT_INDICATORS, lookback
 
+        # Validate provided date format
+        search_date = datetime.datetime\
+                              .strptime(options.plot_from_date, DATE_FORMAT)\
+                              .date()
+        if not options.save_csv:
+            date_from = search_date - datetime.timedelta(
+                                            days=lookback(PLOT_INDICATORS))
+    latest_only = (options.display or options.recipient) and\
+                  not (options.plot or options.save_csv)
+
+    # Load data and prepare it for further analysis, if it is used
+    if options.save_csv or options.display or options.recipient or\
+       options.plot:
+        from history import Covid19HistoryContainer
+
+        covid19_history = Covid19HistoryContainer()
+        loaded = False
+        if options.from_store and not (options.gather or options.backfill):
+            # Freshly gathered data is not in the store yet
+            try:
+                covid19_history.load_data_from_store( options.workspace,
+                                                      date_from=date_from )
+                loaded = True
+            except (FileNotFoundError, ValueError) as err:
+                root_logger.warning("Unable to use history store: %s" %\
+                                    (err,))
+        if not loaded and latest_only:
+            covid19_history.load_latest_from_files(
+                                            options.workspace,
+                                            use_cache=not options.no_cache,
+                                            jobs=options.jobs )
+        elif not loaded:
+            covid19_history.load_data_from_files(
+                                            options.workspace,
+                                            use_cache=not options.no_cache,
+                                            jobs=options.jobs,
+                                            date_from=date_from )
+
+    # Actions only read loaded data, so they are run concurrently
+    scheduler = ActionScheduler()
     if options.save_csv:
-        covid19_history.to_csv()
+        scheduler.add("save_csv", "thread", covid19_history.to_csv)
 
+    if options.display or options.recipient:
+        summary = covid19_history.get_summary()
     if options.display:
-        data = covid19_history.get_data_to_analyse()
-        utils.display_todays_stats_for_all_locations(data)
+        scheduler.add("display", "inline",
+                      utils.display_todays_stats_for_all_locations, summary)
 
     if options.recipient:
-        data = covid19_history.get_data_to_analyse()
-        utils.send_summary_email( options.recipient, data )
+        scheduler.add("email", "thread",
+                      utils.send_summary_email, options.recipient, summary)
 
     if options.plot:
-        data = covid19_history.get_data_to_analyse()
+        data = covid19_history.get_data_to_analyse(PLOT_INDICATORS)
+        if data["POLSKA"].empty:
+            raise ValueError(f"No data since {search_date}")
 
-        # Validate provided date format and range
+        # Validate provided date range
         last_date = data["POLSKA"]["date"].iloc[-1]
-        search_date = datetime.datetime\
-                              .strptime(options.plot_from_date, DATE_FORMAT)\
-                              .date()
         if search_date < datetime.date(2020, 3, 3) or search_date > last_date:
             raise ValueError(f"Valid date range 2020-03-03...{last_date}")
 
-        # Search for first index with provided date
-        start_index = data["POLSKA"]\
-                        .index[data["POLSKA"]["date"] == search_date]\
-                        .to_list()[0]
-
-        # Trim data to selected range
-        for loc, values in data.items():
-            data[loc] = values[start_index::]
+        # Trim data to selected range, previous days were needed only by
+        # indicators, data saved in CSV files is kept
+        data = { loc: values[values["date"] >= search_date]
+                 for loc, values in data.items() }
 
-        plot.plot_summary_data( data, options.workspace)
+        # Rendering is CPU bound, matplotlib is imported only by the worker
+        scheduler.add("plot", "process", "plot:plot_summary_data",
+                      data, options.workspace, None,
+                      options.force_plot or options.no_cache,
+                      options.plot_mode)
 
+    if not scheduler.run():
+        sys.exit(1)
@@ -10,99 +10,324 @@ __email__       = "oscarsierraproject@protonmail.com"
 __status__      = "Development"
 
 
-from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+import hashlib
+import html
+import http.client
 import json
 import logging
 import os
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+import urllib.error
 import urllib.request
 
-from entities import LocationEntity, LocationsLibrary
-from serializers import CovidJsonEncoder
+from entities import LocationsLibrary
+from normalize import normalize_parsed_data
+from serializers import SNAPSHOT_FORMATS, dumps_snapshot
+
+# Fetch engine with asyncio is imported only for backfill, see backfill()
+if TYPE_CHECKING:
+    from fetch import AsyncFetchEngine
+
+class RegisterDataExtractor(object):
+    """ Streaming extractor of 'registerData' element text from HTML page.
+
+    Page is read in chunks and reading stops as soon as closing tag of the
+    element arrives, so the rest of the page is neither downloaded nor
+    parsed. Everything read so far is kept in 'content' attribute, to be
+    used by a fallback parser.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    START_TAG = re.compile(rb'<(?P<tag>[A-Za-z][A-Za-z0-9]*)\s[^>]*?'
+                           rb'\bid\s*=\s*(?P<q>["\']?)registerData(?P=q)'
+                           rb'(?=[\s/>])[^>]*>')
+    # Longest start tag expected to be split between two chunks
+    OVERLAP = 1024
+
+    def __init__(self) -> None:
+        self.content = bytearray()
+
+    def extract(self, stream:Any, encoding:str="utf-8") -> Optional[str]:
+        """ Return text of the element, None if it can not be found or it
+        has nested markup """
+        start, end_tag, search_from = None, b"", 0
+        while True:
+            chunk = stream.read(self.CHUNK_SIZE)
+            self.content += chunk
+            if start is None:
+                match = self.START_TAG.search(self.content, search_from)
+                if match:
+                    start = match.end()
+                    end_tag = b"</" + match.group("tag")
+                    search_from = start
+                else:
+                    search_from = max(0, len(self.content) - self.OVERLAP)
+            if start is not None:
+                end = self.content.find(end_tag, search_from)
+                if end >= 0:
+                    text = self.content[start:end].decode(encoding)
+                    return None if "<" in text else html.unescape(text)
+                search_from = max(start, len(self.content) - len(end_tag))
+            if not chunk:
+                return None
+
+
+class ResponseCache(object):
+    """ On-disk cache of responses for crawled URLs.
+
+    For every URL cache keeps validators sent by the server, ETag and
+    Last-Modified, used to make conditional requests, and SHA-256 hash of
+    the last saved payload.
+    """
+
+    FILE_NAME = ".http_cache.json"
+    VERSION = "1.0.0"
+
+    def __init__(self, cache_dir:str) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = os.path.join(cache_dir, self.FILE_NAME)
+        self._urls: Dict[str, Dict[str, str]] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if data["_type"] != self.__class__.__name__ or\
+                   data["_version"] != self.VERSION:
+                    raise ValueError("Unsupported cache format")
+                self._urls = dict(data["urls"])
+            except (OSError, KeyError, TypeError, ValueError) as err:
+                self.logger.warning("Response cache %s is corrupted (%s), "\
+                                    "dropping it" % (self.path, err))
+
+    def get(self, url:str) -> Dict[str, str]:
+        """ Return everything known about a URL """
+        return dict(self._urls.get(url, {}))
+
+    def conditional_headers(self, url:str) -> Dict[str, str]:
+        """ Return headers making request conditional """
+        entry = self._urls.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url:str, entry:Dict[str, str]) -> None:
+        """ Store entry of a URL in cache file """
+        self._urls[url] = dict(entry)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({ "_type": self.__class__.__name__,
+                        "_version": self.VERSION,
+                        "urls": self._urls}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
 
 class Covid19DataCrawler(object):
     """ Web crawler gathering and storing data from gov.pl website. """
 
     DATE_FORMAT = "%Y-%m-%d"
     TIME_FORMAT = "%H:%M:%S"
+    URL = "https://www.gov.pl/web/koronawirus/"\
+          "wykaz-zarazen-koronawirusem-sars-cov-2"
+    # Snapshots of gov.pl page kept by the Internet Archive, used to backfill
+    # missing days. Archive redirects to the closest snapshot, which may be
+    # from another day, so date of the snapshot is taken from final URL.
+    ARCHIVE_URL = "https://web.archive.org/web/{date:%Y%m%d}235959id_/" + URL
+    ARCHIVE_SNAPSHOT = re.compile(r"/web/(\d{14})(?:[a-z]{2}_)?/")
+    # Time of samples in backfilled snapshots
+    ARCHIVE_TIME = time(23, 59, 59)
 
-    def __init__(self):
+    def __init__(self, url:str=URL, cache_dir:Optional[str]=None,
+                       archive_url:str=ARCHIVE_URL,
+                       engine:Optional["AsyncFetchEngine"]=None,
+                       fmt:str="json"):
         self.logger         = logging.getLogger(self.__class__.__name__)
+        if fmt not in SNAPSHOT_FORMATS:
+            raise ValueError("Unknown data file format '%s'" % (fmt, ))
+        self.fmt            = fmt
+        self.url            = url
+        self.archive_url    = archive_url
+        self.engine         = engine
+        self.cache          = ResponseCache(cache_dir) if cache_dir else None
+        # Validators and payload hash of the last response
+        self.response: Dict[str, str] = {}
 
-    def save_data_in_file(self, save_dir="") -> None:
-        """ Store gathered data in a file in JSON format """
+    def _check_save_dir(self, save_dir:str) -> str:
         if save_dir == "":
             save_dir = os.path.dirname( os.path.abspath(__file__) )
         elif not os.path.isdir( save_dir ):
             msg = "Directory '%s' does not exist" % save_dir
             self.logger.error(msg)
             raise ValueError(msg)
-        f_name = "COVID19_PL_%s.json" %\
-                 ( datetime.now().strftime("%s" % (self.DATE_FORMAT) ) )
-        dump_data = json.dumps( self.get_data_from_gov_pl(),
-                                cls=CovidJsonEncoder,
-                                indent=2)
-        self.logger.info("Dumping latest COVID19 data to file %s" % (f_name, ))
-        with open(os.path.join(save_dir, f_name), 'w') as f:
+        return save_dir
+
+    def _file_name(self, day:date, fmt:Optional[str]=None) -> str:
+        return "COVID19_PL_%s%s" % ( day.strftime(self.DATE_FORMAT),
+                                     SNAPSHOT_FORMATS[fmt or self.fmt] )
+
+    def _write_library(self, library:LocationsLibrary, path:str) -> None:
+        dump_data = dumps_snapshot(library, self.fmt)
+        self.logger.info("Dumping COVID19 data to file %s" % (path, ))
+        with open(path, 'wb') as f:
             f.write(dump_data)
 
-    def get_data_from_gov_pl(self) -> LocationsLibrary:
-        """ Gather latest COVID19 data from www.gov.pl. """
+    def backfill(self, date_from:date, date_to:date,
+                       save_dir:str="") -> List[date]:
+        """ Fetch archived data of days missing in save_dir.
+
+        Days are fetched concurrently, one snapshot is written for every day.
+        Days which could not be fetched are logged and skipped. Return list
+        of saved days.
+        """
+        import asyncio
+        from fetch import AsyncFetchEngine
+        save_dir = self._check_save_dir(save_dir)
+        if date_from > date_to:
+            raise ValueError("Backfill range %s..%s is empty" % (date_from,
+                                                                 date_to))
+        days = [ date_from + timedelta(days=i)
+                 for i in range((date_to - date_from).days + 1) ]
+        days = [ d for d in days if not any(
+                    os.path.isfile(os.path.join(save_dir,
+                                                self._file_name(d, fmt)))
+                    for fmt in SNAPSHOT_FORMATS) ]
+        self.logger.info("Backfilling %d missing days from %s to %s" %\
+                         (len(days), date_from, date_to))
+        if self.engine is None:
+            self.engine = AsyncFetchEngine()
+        saved = asyncio.run(self._backfill(days, save_dir))
+        self.logger.info("Backfilled %d of %d days" % (len(saved), len(days)))
+        return saved
+
+    async def _backfill(self, days:List[date], save_dir:str) -> List[date]:
+        import asyncio
+        async with self.engine as engine:
+            saved = await asyncio.gather(*[
+                            self._backfill_day(engine, day, save_dir)
+                            for day in days ])
+        return [ day for day in saved if day is not None ]
+
+    @classmethod
+    def _snapshot_date(cls, url:str) -> Optional[date]:
+        """ Return day of archived snapshot from its URL, None if URL is not
+        of an archived snapshot """
+        match = cls.ARCHIVE_SNAPSHOT.search(url)
+        if match is None:
+            return None
+        return datetime.strptime(match.group(1), "%Y%m%d%H%M%S").date()
+
+    async def _backfill_day(self, engine:"AsyncFetchEngine", day:date,
+                                  save_dir:str) -> Optional[date]:
+        import asyncio
+        url = self.archive_url.format(date=day)
+        try:
+            response = await engine.fetch(url)
+            if response.status != 200:
+                raise ValueError("Code %s while opening %s" %\
+                                 (response.status, response.url))
+            snapshot = self._snapshot_date(response.url)
+            if snapshot is not None and snapshot != day:
+                raise ValueError("Closest snapshot %s is from %s" %\
+                                 (response.url, snapshot))
+            _reg_data = self.read_register_data(response)
+            library = self.parse_register_data(_reg_data,
+                                datetime.combine(day, self.ARCHIVE_TIME))
+        except (OSError, EOFError, asyncio.TimeoutError,
+                http.client.HTTPException,
+                AttributeError, KeyError, ValueError) as err:
+            self.logger.warning("Unable to backfill %s: %s" % (day, err))
+            return None
+        self._write_library(library, os.path.join(save_dir,
+                                                  self._file_name(day)))
+        return day
+
+    def save_data_in_file(self, save_dir="") -> None:
+        """ Store gathered data in a file in format given by fmt attribute """
+        save_dir = self._check_save_dir(save_dir)
+        f_name = self._file_name(datetime.now())
+        data = self.get_data_from_gov_pl()
+        if data is None:
+            self.logger.info("Data on gov.pl not modified, nothing to save")
+            return
+        if self.cache and\
+           self.cache.get(self.url).get("sha256") == self.response["sha256"]:
+            self.logger.info("Data on gov.pl did not change, nothing to save")
+            self.cache.update(self.url, self.response)
+            return
+        self._write_library(data, os.path.join(save_dir, f_name))
+        if self.cache:
+            # Validators are stored only once data is safely saved
+            self.cache.update(self.url, self.response)
+
+    def read_register_data(self, response:Any) -> Dict[str, Any]:
+        """ Read 'registerData' JSON from gov.pl page.
+
+        Page is streamed until the element is complete. When the element
+        can not be extracted that way, whole page is parsed with
+        BeautifulSoup.
+        """
+        extractor = RegisterDataExtractor()
+        charset = response.headers.get_content_charset() or "utf-8"
+        text = extractor.extract(response, charset)
+        if text is None:
+            self.logger.warning("Falling back to BeautifulSoup parser")
+            # Imported only when needed, it takes long to load
+            from bs4 import BeautifulSoup
+            bs = BeautifulSoup(bytes(extractor.content) + response.read(),
+                               'html.parser')
+            text = bs.find(id="registerData").text
+        try:
+            return json.loads(text)
+        except ValueError:
+            return json.loads(text.replace("'", "\""))
+
+    def get_data_from_gov_pl(self) -> Optional[LocationsLibrary]:
+        """ Gather latest COVID19 data from www.gov.pl.
+
+        With response cache in use the request is conditional and None is
+        returned when server responds that data was not modified.
+        """
 
-        library = LocationsLibrary()
-        url = "https://www.gov.pl/web/koronawirus/wykaz-zarazen-koronawirusem-sars-cov-2"
         self.logger.info("Gathering Polish COVID19 data ...")
-        web_url  = urllib.request.urlopen( url )
+        headers = self.cache.conditional_headers(self.url) if self.cache\
+                  else {}
+        try:
+            web_url  = urllib.request.urlopen(
+                            urllib.request.Request(self.url, headers=headers))
+        except urllib.error.HTTPError as err:
+            if err.code == 304:
+                self.logger.info("%s not modified" % (self.url, ))
+                return None
+            raise
         if web_url.getcode() != 200:
-            msg = "Code %s while opening %s" % (web_url.getcode(), url)
+            msg = "Code %s while opening %s" % (web_url.getcode(), self.url)
             self.logger.critical(msg)
             raise urllib.error.HTTPError(msg)
         # Gathering data is divided into steps:
         # 1. Gathering "registerData" from a web page
         # 2. Extract JSON data, 'parsedData', from gathered sample
-        bs = BeautifulSoup(web_url.read(), 'html.parser')
-        _reg_data = json.loads( bs.find(id="registerData").text
-                                                          .replace("'", "\""))
-        _parsed_data = json.loads(_reg_data['parsedData'])
-        for data in _parsed_data:
-            """
-            FIX: On March 23rd 2020 there was an issue with data on gov.pl
-                website. Empty records with no data were added, as well as some
-                strange links. If bellow was introduced to deal with corrupted
-                data.
-
-            FIX: On November 24rd 2020 government changed the way how data is
-                displayed. New fields were introduced as well as the meaning
-                of fields changed. For example field 'Liczba' now means daily
-                number of new cases instead of total number of COVID cases.
-            """
-            if "https" in data["Województwo"] or data["Województwo"] == "":
-                continue
-            if datetime.now() < datetime(2020, 11, 24):
-                l = LocationEntity( province = data['Województwo'],
-                                    total    = int(data['Liczba'].replace(" ","")),
-                                    dead     = int(data['Liczba zgonów'].replace(" ",""))\
-                                               if data['Liczba zgonów'] != ''\
-                                               else 0,
-                                    VERSION  = "1.0.0")
-            elif datetime.now() >= datetime(2020, 11, 24):
-                l = LocationEntity(
-                        province = data['Województwo'],
-                        total    = int(data['Liczba'].replace(" ","")),
-                        total_per_10k = float(data['Liczba na 10 tys. mieszkańców']\
-                                                .replace(",",".")\
-                                                .replace(" ","")),
-                        dead     = int(data['Wszystkie przypadki śmiertelne'].replace(" ",""))\
-                                   if data['Wszystkie przypadki śmiertelne'] != ''\
-                                   else 0,
-                        dead_by_covid = int(data['Przypadki śmiertelne w wyniku Covid'].replace(" ",""))\
-                                   if data['Przypadki śmiertelne w wyniku Covid'] != ''\
-                                   else 0,
-                        dead_with_covid = int(data['Przypadki śmiertelne w wyniku chorób współistniejących'].replace(" ",""))\
-                                   if data['Przypadki śmiertelne w wyniku chorób współistniejących'] != ''\
-                                   else 0,
-                        VERSION  = "1.1.0")
-            library.items.append(l)
-        library.items = sorted(library.items)
+        _reg_data = self.read_register_data(web_url)
+        self.response = {
+            "etag":          web_url.headers.get("ETag", ""),
+            "last_modified": web_url.headers.get("Last-Modified", ""),
+            "sha256":        hashlib.sha256(_reg_data['parsedData']\
+                                            .encode("utf-8")).hexdigest()}
+        library = self.parse_register_data(_reg_data, datetime.now())
         self.logger.debug("Gathering Polish COVID19 data complete")
         return library
+
+    def parse_register_data(self, register_data:Dict[str, Any],
+                                  sample_date:datetime) -> LocationsLibrary:
+        """ Convert 'registerData' into library with samples from sample_date.
+
+        FIX: On November 24rd 2020 government changed the way how data is
+            displayed. New fields were introduced as well as the meaning
+            of fields changed. Schema is recognized by names of fields,
+            see normalize.SCHEMAS.
+        """
+        return normalize_parsed_data(json.loads(register_data['parsedData']),
+                                     sample_date)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "10th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import bisect
+from datetime import date
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+class HistoryCube(object):
+    """ SARS-CoV-2 history held as dates x locations x metrics.
+
+    Every metric is a single contiguous dates x locations array, int64 for
+    counts and float64 for rates, so operations over all locations are
+    single vectorized calls. Cells without a sample are marked in the
+    'present' mask and hold zeros.
+    """
+
+    METRICS = [ "total", "total_per_10k",
+                "dead", "dead_by_covid", "dead_with_covid"]
+    DTYPES  = { "total_per_10k": np.float64 }
+
+    def __init__(self, dates:np.ndarray, locations:List[str],
+                       data:Dict[str, np.ndarray],
+                       present:Optional[np.ndarray]=None) -> None:
+        self.dates = dates
+        self.locations = list(locations)
+        self._loc_idx = {loc: i for i, loc in enumerate(self.locations)}
+        self._data = { m: np.ascontiguousarray(data[m],
+                                               dtype=self.DTYPES.get(m, np.int64))
+                       for m in self.METRICS }
+        if present is None:
+            present = np.ones(self.shape, dtype=bool)
+        self.present = present
+
+    @classmethod
+    def from_columns(cls, columns:Dict[str, np.ndarray]) -> "HistoryCube":
+        """ Build cube from flat column buffers with one row per sample """
+        d_codes, dates = pd.factorize(columns["date"], sort=True)
+        p_codes, locations = pd.factorize(columns["province"])
+        shape = (len(dates), len(locations))
+        present = np.zeros(shape, dtype=bool)
+        present[d_codes, p_codes] = True
+        data = {}
+        for m in cls.METRICS:
+            data[m] = np.zeros(shape, dtype=cls.DTYPES.get(m, np.int64))
+            data[m][d_codes, p_codes] = columns[m]
+        _dates = np.empty(len(dates), dtype=object)
+        _dates[:] = list(dates)
+        return cls(_dates, list(locations), data, present)
+
+    def __getitem__(self, metric:str) -> np.ndarray:
+        """ Return dates x locations array of a metric """
+        return self._data[metric]
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.dates), len(self.locations))
+
+    def between(self, date_from:Optional[date]=None,
+                      date_to:Optional[date]=None) -> "HistoryCube":
+        """ Return cube of days from date_from to date_to, both included.
+
+        Arrays of returned cube are views of this cube's arrays.
+        """
+        dates = list(self.dates)
+        start = bisect.bisect_left(dates, date_from) if date_from else 0
+        stop = bisect.bisect_right(dates, date_to) if date_to else len(dates)
+        rows = slice(start, max(start, stop))
+        return HistoryCube(self.dates[rows], self.locations,
+                           { m: self._data[m][rows] for m in self.METRICS },
+                           self.present[rows])
+
+    def index_of(self, location:str) -> int:
+        """ Return column of a location """
+        return self._loc_idx[location]
+
+    def sum(self, metric:str) -> np.ndarray:
+        """ Return sum of a metric over all dates for every location """
+        return self._data[metric].sum(axis=0)
+
+    def cumsum(self, metric:str) -> np.ndarray:
+        """ Return running total of a metric for every location """
+        return self._data[metric].cumsum(axis=0)
+
+    def rolling_mean(self, metric:str, window:int) -> np.ndarray:
+        """ Return simple moving average of a metric for every location.
+
+        First window-1 rows are NaN, same as in pandas rolling(window).mean()
+        """
+        values = self._data[metric].astype(np.float64)
+        result = np.full(values.shape, np.nan)
+        if window <= len(values):
+            acc = np.zeros((len(values) + 1, values.shape[1]))
+            np.cumsum(values, axis=0, out=acc[1:])
+            result[window-1:] = (acc[window:] - acc[:-window]) / window
+        return result
+
+    def latest(self, metric:str, days:int=1) -> np.ndarray:
+        """ Return values of a metric from the most recent days """
+        return self._data[metric][-days:]
+
+    def to_frames(self, total_sum:Optional[np.ndarray]=None)\
+                                        -> Dict[str, pd.DataFrame]:
+        """ Return data as separate DataFrame for every location.
+
+        Each frame has a 'date' column, one column for every metric and
+        a 'total_sum' column holding running total of cases, unless given
+        computed as a plain cumulative sum.
+        """
+        frames: Dict[str, pd.DataFrame] = {}
+        if total_sum is None:
+            total_sum = self.cumsum("total")
+        total_sum = np.asarray(total_sum, dtype=np.float64)
+        for i, loc in enumerate(self.locations):
+            rows = self.present[:, i]
+            frame = {"date": self.dates[rows]}
+            for m in self.METRICS:
+                frame[m] = self._data[m][rows, i]
+            frame["total_sum"] = total_sum[rows, i]
+            frames[loc] = pd.DataFrame(frame)
+        return frames
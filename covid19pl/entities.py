@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, List
+import numpy as np
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 
 __author__      = "oscarsierraproject.eu"
@@ -84,3 +86,164 @@ class LocationsLibrary(BaseEntity):
             raise NotImplementedError
         return self.date < other.date
 
+
+# Typed arrays used by LocationsTable for every LocationEntity field
+LOCATION_DTYPES = { "province":         object,
+                    "total":            np.int64,
+                    "total_per_10k":    np.float64,
+                    "dead":             np.int64,
+                    "recovered":        np.int64,
+                    "dead_by_covid":    np.int64,
+                    "dead_with_covid":  np.int64,
+                    "date":             "datetime64[us]",
+                    "VERSION":          object}
+
+
+def _row_property(name:str) -> property:
+    """ Return property giving access to a field of LocationRow """
+    if LOCATION_DTYPES[name] is object:
+        def getter(self):
+            return self._table._columns[name][self._idx]
+    else:
+        # Return plain Python value, not a NumPy scalar
+        def getter(self):
+            return self._table._columns[name][self._idx].item()
+    def setter(self, value):
+        self._table._columns[name][self._idx] = value
+    return property(getter, setter)
+
+
+class LocationRow(object):
+    """ Lightweight view of a single LocationsTable row.
+
+    Row keeps field names of LocationEntity and compares the same way.
+    """
+
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table:"LocationsTable", idx:int) -> None:
+        self._table = table
+        self._idx = idx
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (LocationEntity, LocationRow)):
+            raise NotImplementedError
+        return self.province == other.province
+
+    def __gt__(self, other: object) -> bool:
+        if not isinstance(other, (LocationEntity, LocationRow)):
+            raise NotImplementedError
+        return self.province > other.province
+
+    def __lt__(self, other: object) -> bool:
+        if not isinstance(other, (LocationEntity, LocationRow)):
+            raise NotImplementedError
+        return self.province < other.province
+
+    def __repr__(self):
+        return "%-20s: %7d %7d %7d" % \
+                (self.province, self.total, self.dead, self.recovered)
+
+    def to_entity(self) -> LocationEntity:
+        """ Return copy of the row as LocationEntity """
+        return LocationEntity(**{f: getattr(self, f) for f in LOCATION_DTYPES})
+
+for _name in LOCATION_DTYPES:
+    setattr(LocationRow, _name, _row_property(_name))
+
+
+class LocationRows(Sequence):
+    """ Sequence of LocationsTable rows, used as its 'items' """
+
+    __slots__ = ("_table", )
+
+    def __init__(self, table:"LocationsTable") -> None:
+        self._table = table
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("LocationRows index out of range")
+        return LocationRow(self._table, idx)
+
+    def __len__(self) -> int:
+        return len(self._table._columns["province"])
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def sort(self) -> None:
+        """ Sort rows by province, same as list of LocationEntity """
+        self._table.sort()
+
+
+class LocationsTable(LocationsLibrary):
+    """ LocationsLibrary storing items as parallel typed arrays.
+
+    Every LocationEntity field is kept in its own array, see
+    LOCATION_DTYPES, and items are exposed as LocationRow views. Memory per
+    item is a few dozen bytes instead of a dataclass instance with its own
+    dictionary and datetime object.
+    """
+
+    def __init__(self, VERSION:str="1.0.0", date:Optional[datetime]=None,
+                       items:Iterable[Any]=()) -> None:
+        self.VERSION = VERSION
+        self.date = datetime.now() if date is None else date
+        self.items = items
+
+    @classmethod
+    def from_columns(cls, VERSION:str, date:datetime,
+                          columns:Dict[str, Any]) -> "LocationsTable":
+        """ Create table straight from columns of LocationEntity fields """
+        table = cls(VERSION, date)
+        table._set_columns(columns)
+        return table
+
+    @classmethod
+    def from_library(cls, library:LocationsLibrary) -> "LocationsTable":
+        """ Convert LocationsLibrary into LocationsTable """
+        if isinstance(library, LocationsTable):
+            return library
+        return cls(library.VERSION, library.date, library.items)
+
+    def _set_columns(self, columns:Dict[str, Any]) -> None:
+        self._columns = {}
+        for name, dtype in LOCATION_DTYPES.items():
+            values = columns[name]
+            if dtype is object:
+                # Same names repeat every day, keep a single copy of each
+                values = [sys.intern(v) for v in values]
+                array = np.empty(len(values), dtype=object)
+                array[:] = values
+            else:
+                array = np.asarray(values, dtype=dtype)
+            self._columns[name] = array
+
+    @property
+    def items(self) -> LocationRows:
+        return LocationRows(self)
+
+    @items.setter
+    def items(self, items:Iterable[Any]) -> None:
+        items = list(items)
+        self._set_columns({ name: [getattr(i, name) for i in items]
+                            for name in LOCATION_DTYPES })
+
+    def column(self, name:str) -> np.ndarray:
+        """ Return array with all values of a LocationEntity field """
+        return self._columns[name]
+
+    def sort(self) -> None:
+        """ Sort items by province """
+        order = np.argsort(self._columns["province"], kind="stable")
+        for name in self._columns:
+            self._columns[name] = self._columns[name][order]
+
+    def to_library(self) -> LocationsLibrary:
+        """ Return copy of the table as LocationsLibrary """
+        return LocationsLibrary(VERSION=self.VERSION, date=self.date,
+                                items=[row.to_entity() for row in self.items])
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "17th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import asyncio
+import http.client
+import io
+import logging
+import ssl
+from typing import Dict, List, Optional, Union
+import urllib.parse
+
+from __version__ import __version__
+
+
+class Response(object):
+    """ Completed HTTP response with whole body read into memory.
+
+    It mimics the part of a urllib response used by the crawler, so both can
+    be handled by the same code.
+    """
+
+    def __init__(self, url:str, status:int, headers:http.client.HTTPMessage,
+                       body:bytes) -> None:
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self._body = io.BytesIO(body)
+
+    def getcode(self) -> int:
+        return self.status
+
+    def read(self, size:int=-1) -> bytes:
+        return self._body.read(size)
+
+
+class AsyncFetchEngine(object):
+    """ Asynchronous HTTP/1.1 client fetching many pages concurrently.
+
+    Number of requests in flight is bounded, requests to every host are
+    spaced according to the rate limit and connections are kept alive and
+    reused. Failed requests, timeouts and responses with retryable status
+    are repeated with exponential backoff. Redirects are followed, up to
+    MAX_REDIRECTS of them.
+
+    Use as an asynchronous context manager, pooled connections are closed
+    on exit.
+    """
+
+    CONCURRENCY = 8
+    RATE = 4.0              # Requests per second to a single host
+    TIMEOUT = 30.0          # Seconds for a single request
+    RETRIES = 3
+    BACKOFF = 0.5           # Seconds before first retry, doubled every time
+    MAX_REDIRECTS = 5
+    REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    USER_AGENT = "covid19pl/%s" % (__version__, )
+
+    def __init__(self, concurrency:int=CONCURRENCY, rate:float=RATE,
+                       timeout:float=TIMEOUT, retries:int=RETRIES,
+                       backoff:float=BACKOFF) -> None:
+        if concurrency < 1 or rate <= 0:
+            raise ValueError("Concurrency and rate must be positive")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: Dict[tuple, List[tuple]] = {}
+        self._next_slot: Dict[str, float] = {}
+        self.requests: int = 0
+        self.connections: int = 0
+        self.retried: int = 0
+
+    async def __aenter__(self) -> "AsyncFetchEngine":
+        # Created here to be bound to the running event loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        for idle in self._idle.values():
+            for reader, writer in idle:
+                writer.close()
+        self._idle = {}
+        self.logger.debug("%d requests over %d connections, %d retries" %\
+                          (self.requests, self.connections, self.retried))
+
+    async def fetch_all(self, urls:List[str],
+                        headers:Optional[Dict[str, str]]=None)\
+                        -> List[Union[Response, Exception]]:
+        """ Fetch all URLs concurrently.
+
+        Results are in order of URLs, a request which failed for good is
+        represented by its exception.
+        """
+        return await asyncio.gather(*[self.fetch(url, headers)
+                                      for url in urls],
+                                    return_exceptions=True)
+
+    async def fetch(self, url:str,
+                    headers:Optional[Dict[str, str]]=None) -> Response:
+        """ Fetch URL, following redirects and retrying failures.
+
+        Response with retryable status is returned when retries are
+        exhausted, errors are raised. More than MAX_REDIRECTS redirects
+        raise http.client.HTTPException.
+        """
+        attempt, redirects = 0, 0
+        while True:
+            response, error = None, None
+            async with self._semaphore:
+                await self._wait_for_slot(urllib.parse.urlsplit(url).hostname)
+                try:
+                    response = await asyncio.wait_for(
+                                        self._request(url, headers or {}),
+                                        self.timeout)
+                except (OSError, EOFError, http.client.HTTPException,
+                        asyncio.TimeoutError) as err:
+                    error = err
+            if response is not None and\
+               response.status in self.REDIRECT_STATUSES and\
+               response.headers.get("Location"):
+                if redirects >= self.MAX_REDIRECTS:
+                    raise http.client.HTTPException("More than %d redirects "\
+                                    "while opening %s" % (self.MAX_REDIRECTS,
+                                                          url))
+                url = urllib.parse.urljoin(url, response.headers["Location"])
+                redirects += 1
+                continue
+            if error is None and response.status not in self.RETRY_STATUSES:
+                return response
+            if attempt >= self.retries:
+                if error is not None:
+                    raise error
+                return response
+            delay = self.backoff * 2 ** attempt
+            if response is not None and\
+               response.headers.get("Retry-After", "").isdigit():
+                delay = max(delay, int(response.headers["Retry-After"]))
+            attempt += 1
+            self.retried += 1
+            self.logger.warning("Retrying %s in %.1fs after %s" %\
+                                (url, delay, error or response.status))
+            await asyncio.sleep(delay)
+
+    async def _wait_for_slot(self, host:str) -> None:
+        """ Wait until next request to the host is allowed """
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _connection(self, key:tuple, fresh:bool=False) -> tuple:
+        """ Return reader, writer and flag if connection is reused """
+        idle = self._idle.get(key, [])
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        context = ssl.create_default_context() if scheme == "https" else None
+        reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        self.connections += 1
+        return reader, writer, False
+
+    async def _request(self, url:str, headers:Dict[str, str]) -> Response:
+        """ Make a single GET request over a pooled connection """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Unsupported URL %s" % (url, ))
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        lines = [   "GET %s HTTP/1.1" % (path, ),
+                    "Host: %s" % (parts.netloc.rpartition("@")[2], ),
+                    "User-Agent: %s" % (self.USER_AGENT, ),
+                    "Accept-Encoding: identity",
+                    "Connection: keep-alive"]
+        lines += ["%s: %s" % (k, v) for k, v in headers.items()]
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        fresh = False
+        while True:
+            reader, writer, reused = await self._connection(key, fresh)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, message, body, keep_alive = await self._read(reader)
+            except (OSError, EOFError):
+                writer.close()
+                if reused:
+                    # Server closed idle connection, repeat on a new one
+                    fresh = True
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            break
+        self.requests += 1
+        if keep_alive:
+            self._idle.setdefault(key, []).append((reader, writer))
+        else:
+            writer.close()
+        return Response(url, status, message, body)
+
+    @staticmethod
+    async def _read(reader:asyncio.StreamReader) -> tuple:
+        """ Read a response, return status, headers, body and keep-alive """
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        try:
+            version, status = status_line.split(None, 2)[:2]
+            status = int(status)
+        except ValueError:
+            raise http.client.BadStatusLine(repr(status_line))
+        head = b""
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            head += line
+        message = http.client.parse_headers(io.BytesIO(head + b"\r\n"))
+        keep_alive = version == b"HTTP/1.1" and\
+                     message.get("Connection", "").lower() != "close"
+        if status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif message.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b";")[0], 16)
+                except ValueError:
+                    raise http.client.HTTPException("Malformed chunk size "\
+                                                    "%r" % (line, ))
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            # Skip trailer headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            body = b"".join(chunks)
+        elif message.get("Content-Length") is not None:
+            body = await reader.readexactly(int(message["Content-Length"]))
+        else:
+            # Body is delimited by closing the connection
+            body = await reader.read()
+            keep_alive = False
+        return status, message, body, keep_alive
@@ -9,117 +9,458 @@ __maintainer__  = "oscarsierraproject.eu"
 __email__       = "oscarsierraproject@protonmail.com"
 __status__      = "Development"
 
-from datetime import datetime
+import bisect
+from datetime import date, datetime
 import logging
+import numpy as np
 import os
 import pandas as pd
-from typing import Dict, List
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from entities import LocationEntity, LocationsLibrary
-from serializers import CovidJsonDecoder
+from cube import HistoryCube
+from entities import LOCATION_DTYPES, LocationsLibrary, LocationsTable
+from indicators import IndicatorEngine, SUMMARY_INDICATORS, lookback
+from ingest import IngestCache, decode_files
+from serializers import columns_to_table
+from store import HistoryStore
+from totals import RunningTotals
 
 class Covid19HistoryContainer(object):
     """ Iterable container holding all gathered SARS-CoV-2 data """
 
+    # Columns published by gov.pl as running totals before November 24, 2020.
+    # Column 'recovered' was never published so it's skipped.
+    DELTA_COLUMNS = ["total", "dead"]
+    # Meaning of values held by each LocationEntity version. Values of
+    # cumulative versions are converted into daily deltas while loading.
+    VERSION_REGIMES = { "1.0.0": "cumulative",
+                        "1.1.0": "daily"}
+    # Data files are named after the day they were gathered on
+    FILE_DATE = re.compile(r"COVID19_PL_(\d{4}-\d{2}-\d{2})")
+    # Running totals saved by last load of whole history
+    CHECKPOINT_NAME = ".running_totals.npz"
+
     def __init__(self) -> None:
         self._idx:int = 0
         self._size:int = 0
         self._data:Dict[str, pd.DataFrame]
+        self._cube:HistoryCube
+        self._totals:RunningTotals
+        self._indicators = IndicatorEngine()
         self._history: List[LocationsLibrary] = []
         self.logger = logging.getLogger(self.__class__.__name__)
 
     def _add_history_data(self, data:LocationsLibrary) -> None:
-        """ Add data to historical data to history container.
+        """ Add data to historical data to history container. """
+        self.add_many([data])
+
+    def add_many(self, libraries:Iterable[LocationsLibrary]) -> None:
+        """ Add multiple samples to history container.
 
         It is important to store data sorted at this stage, as methods
-        executed later will assume that data is in order.
+        executed later will assume that data is in order. Samples coming
+        in date order, as from sorted data files, are simply appended,
+        other ones are inserted in place with bisect. Sample from a day
+        already present in history replaces the previous one.
         """
-        if not isinstance(data, LocationsLibrary):
-            raise ValueError("Not compatible data type")
-        # : It is important to have data sorted at this stage!
-        data.items.sort()
-        self._history.append(data)
-        self._history.sort()
+        for data in libraries:
+            if not isinstance(data, LocationsLibrary):
+                raise ValueError("Not compatible data type")
+            # : It is important to have data sorted at this stage!
+            data.items.sort()
+            if not self._history or\
+               self._history[-1].date.date() < data.date.date():
+                self._history.append(data)
+                continue
+            idx = bisect.bisect_left(self._history, data)
+            for i in [idx, idx - 1]:
+                if 0 <= i < len(self._history) and\
+                   self._history[i].date.date() == data.date.date():
+                    self.logger.warning("Replacing data from %s with data "\
+                                        "from %s" % (self._history[i].date,
+                                                     data.date))
+                    self._history[i] = data
+                    break
+            else:
+                self._history.insert(idx, data)
         self._size = len(self._history)
 
+    def _collect_columns(self) -> Dict[str, np.ndarray]:
+        """ Gather all LocationEntity values into flat column buffers.
+
+        Columns of every sample, kept as LocationsTable, are concatenated,
+        so cost grows linearly with the number of samples.
+        """
+        tables = [LocationsTable.from_library(l) for l in self._history]
+        def concat(name:str) -> np.ndarray:
+            if not tables:
+                return np.empty(0, dtype=LOCATION_DTYPES[name])
+            return np.concatenate([t.column(name) for t in tables])
+        names, inverse = np.unique(concat("province"), return_inverse=True)
+        keys = np.empty(len(names), dtype=object)
+        keys[:] = [self._province_key(n) for n in names]
+        return {"province":         keys[inverse.reshape(-1)],
+                "date":             concat("date").astype("datetime64[D]")\
+                                                  .astype(object),
+                "total":            concat("total"),
+                "total_per_10k":    concat("total_per_10k"),
+                "dead":             concat("dead"),
+                "dead_by_covid":    concat("dead_by_covid"),
+                "dead_with_covid":  concat("dead_with_covid"),
+                "VERSION":          concat("VERSION")}
+
+    @staticmethod
+    def _province_key(name:str) -> str:
+        """ Return name under which province data is stored """
+        if name in ["Cała Polska", "Cały kraj"]:
+            return "POLSKA"
+        return name.upper()
+
     def _move_data_dataframe(self) -> Dict[str, pd.DataFrame]:
         """ Store data into Pandas Data Frame for further use """
-        data: Dict[str, pd.DataFrame] = {}
-        columns = [ "date", "total", "total_per_10k",
-                    "dead", "dead_by_covid", "dead_with_covid"]
-        for loc_lib in self._history:
-            for loc in loc_lib.items:
-                if loc.province in ["Cała Polska", "Cały kraj"]:
-                    province = "POLSKA"
-                else:
-                    province = loc.province.upper()
-                if province not in data.keys():
-                    data[province] = pd.DataFrame(  columns = columns)
-                tmp = { "date": loc.date.date(),
-                        "total": loc.total,
-                        "total_per_10k": loc.total_per_10k,
-                        "dead": loc.dead,
-                        "dead_by_covid": loc.dead_by_covid,
-                        "dead_with_covid": loc.dead_with_covid}
-                data[province].loc[len(data[province].index)] = tmp
+        self._use_cube(self._build_cube())
+        return self._data
 
+    def _build_cube(self) -> HistoryCube:
+        """ Convert history into cube of normalized daily values """
+        columns = self._collect_columns()
         # Make LocationEntity v. 1.0.0 and 1.1.0 data compatible
-        for _, value in data.items():
-            self._process_data_to_daily_values(value)
-            # Verify if last record has today's data, else zero it
-            if value["total"].iat[-1] == value["total"].iat[-2] and\
-               value["dead"].iat[-1] == value["dead"].iat[-2]:
-                value["total"].iat[-1] = 0
-                value["total_per_10k"].iat[-1] = 0
-                value["dead"].iat[-1] = 0
-                value["dead_by_covid"].iat[-1] = 0
-                value["dead_with_covid"].iat[-1] = 0
-            value["total_sum"] = value["total"]\
-                                .rolling(min_periods=0, window=65535)\
-                                .sum()
-            # TODO: Add missing people in "total_sum" which were not included
-            # in previous gov.pl data:
-            # - (-611) on 22.11.2020
-            # - (+22594) on 24.11.2020
-        return data
-
-    def _process_data_to_daily_values(self, df: pd.DataFrame) -> None:
-        """ Proces location dataframe and convert all values in it
-        into a daily deltas.
+        self._process_data_to_daily_values(columns)
+        return HistoryCube.from_columns(columns)
+
+    def _use_cube(self, cube:HistoryCube,
+                        date_from:Optional[date]=None,
+                        date_to:Optional[date]=None,
+                        checkpoint:Optional[RunningTotals]=None) -> None:
+        """ Prepare data for analysis from cube of normalized values.
+
+        Data is limited to given date range, running totals at its start
+        are taken from checkpoint, if given, or from the whole cube.
+        """
+        self._clear_repeated_last_samples(cube)
+        if date_from is not None or date_to is not None:
+            if checkpoint is None:
+                checkpoint = RunningTotals.from_cube(cube)
+            cube = cube.between(date_from, date_to)
+        self._cube = cube
+        # Running totals include people missing in gov.pl data, see
+        # RunningTotals.CORRECTIONS
+        self._totals = RunningTotals.from_cube(cube, checkpoint)
+        self._data = cube.to_frames(self._totals["total"])
+        self._indicators.update(cube, self._totals)
+
+    @staticmethod
+    def _clear_repeated_last_samples(cube:HistoryCube) -> None:
+        """ Verify if last record of each location has today's data,
+        else zero it """
+        rows = np.where(cube.present, np.arange(len(cube.dates))[:, None], -1)
+        # Cube of an empty workspace has no dates, hence the initial value
+        last = rows.max(axis=0, initial=-1)
+        prev = np.where(rows == last, -1, rows).max(axis=0, initial=-1)
+        locs = np.flatnonzero(prev >= 0)
+        last, prev = last[locs], prev[locs]
+        repeated = (cube["total"][last, locs] == cube["total"][prev, locs]) &\
+                   (cube["dead"][last, locs] == cube["dead"][prev, locs])
+        for metric in cube.METRICS:
+            cube[metric][last[repeated], locs[repeated]] = 0
+
+    def _process_data_to_daily_values(self,
+                                      columns:Dict[str, np.ndarray]) -> None:
+        """ Convert cumulative values in column buffers into daily deltas.
+
         Step required due to change the way how data is being served
-        on source, gov.pl, site.
-        November 23, 2020 is a point where data serving was change from
-        incremental into a daily deltas."""
-
-        idx = df["date"][df["date"] == datetime(2020,11,23).date()].index[0]
-        while(idx>0):
-            df.total.iloc[idx] = df.total.iloc[idx] - df.total.iloc[idx-1]
-            df.dead.iloc[idx] = df.dead.iloc[idx] - df.dead.iloc[idx-1]
-            # df.recovered was never published so it's skipped
-            idx -= 1
-
-    def get_data_to_analyse(self) -> Dict[str, pd.DataFrame]:
-        """ Return DataFrame filled with data from JSON files """
-        return self._data
+        on source, gov.pl, site. Regime of each sample is taken from its
+        LocationEntity VERSION, see VERSION_REGIMES. All provinces are
+        converted at once on a dates x provinces grid, where a cumulative
+        sample becomes a difference to the previous sample of the same
+        province, as long as that one is cumulative as well.
+        """
+        try:
+            cumulative = np.array([ self.VERSION_REGIMES[v] == "cumulative"
+                                    for v in columns["VERSION"]], dtype=bool)
+        except KeyError as err:
+            raise ValueError("Unsupported LocationEntity version %s" % err)
+        if not cumulative.any():
+            return
+        d_codes, dates = pd.factorize(columns["date"], sort=True)
+        p_codes, provinces = pd.factorize(columns["province"])
+        shape = (len(dates), len(provinces))
+
+        # Row of previous sample for every cell, -1 if there is none
+        present = np.full(shape, -1, dtype=np.int64)
+        present[d_codes, p_codes] = d_codes
+        last = np.maximum.accumulate(present, axis=0)
+        prev = np.full(shape, -1, dtype=np.int64)
+        prev[1:] = last[:-1]
+        prev_row = prev[d_codes, p_codes]
+
+        regime = np.zeros(shape, dtype=bool)
+        regime[d_codes, p_codes] = cumulative
+        has_prev = prev_row >= 0
+        convert = cumulative & has_prev
+        convert[has_prev] &= regime[prev_row[has_prev], p_codes[has_prev]]
+
+        grid = np.zeros((len(self.DELTA_COLUMNS),) + shape, dtype=np.int64)
+        values = np.stack([columns[c] for c in self.DELTA_COLUMNS])
+        grid[:, d_codes, p_codes] = values
+        previous = grid[:, np.maximum(prev_row, 0), p_codes]
+        deltas = np.where(convert, values - previous, values)
+        for i, column in enumerate(self.DELTA_COLUMNS):
+            columns[column] = deltas[i]
+
+    def get_data_to_analyse(self, indicators:Iterable[str]=())\
+                                            -> Dict[str, pd.DataFrame]:
+        """ Return DataFrame filled with data from JSON files.
+
+        Frames are copied and extended with a column of every given
+        indicator, see IndicatorEngine, otherwise frames are shared.
+        """
+        names = list(indicators)
+        if not names:
+            return self._data
+        values = { n: self._indicators[n] for n in names }
+        frames = {}
+        for i, loc in enumerate(self._cube.locations):
+            rows = self._cube.present[:, i]
+            columns = { n: v[rows, i] for n, v in values.items() }
+            frames[loc] = self._data[loc].assign(**columns)
+        return frames
+
+    def get_summary(self, indicators:Iterable[str]=SUMMARY_INDICATORS)\
+                                                            -> pd.DataFrame:
+        """ Return latest data of every location as a single frame.
+
+        Frame is indexed by location and holds date of the last sample,
+        its values, running totals of cases and deaths, and given
+        indicators of the last sample.
+        """
+        cube = self._cube
+        rows = np.where(cube.present, np.arange(len(cube.dates))[:, None], -1)
+        last = rows.max(axis=0, initial=-1)
+        locs = np.flatnonzero(last >= 0)
+        last = last[locs]
+        return pd.DataFrame({
+                    "date":         cube.dates[last],
+                    "total":        self._totals.latest("total")[locs],
+                    "dead":         self._totals.latest("dead")[locs],
+                    "total_today":  cube["total"][last, locs],
+                    "dead_today":   cube["dead"][last, locs],
+                    **{ n: self._indicators[n][last, locs]
+                        for n in indicators }},
+                    index=[ cube.locations[i] for i in locs ])
+
+    def get_cube(self) -> HistoryCube:
+        """ Return data as dates x locations arrays of every metric """
+        return self._cube
+
+    def get_totals(self) -> RunningTotals:
+        """ Return running totals of every metric and location """
+        return self._totals
+
+    def get_indicators(self) -> IndicatorEngine:
+        """ Return indicators of every location computed from loaded data """
+        return self._indicators
 
     def get_history(self) -> List[LocationsLibrary]:
         """ Return a copy of collected history"""
         return self._history[::]
 
-    def load_data_from_files(self, save_dir:str="") -> None:
-        """ Load JSON data from files and store it in history attribute """
+    @classmethod
+    def _file_date(cls, path:str) -> Optional[date]:
+        """ Return date from name of a data file, None if there is none """
+        match = cls.FILE_DATE.search(os.path.basename(path))
+        if match is None:
+            return None
+        return datetime.strptime(match.group(1), "%Y-%m-%d").date()
+
+    @staticmethod
+    def _stats(paths:List[str]) -> Dict[str, Tuple[int, int]]:
+        """ Return size and modification time of files by their names """
+        stats = {}
+        for path in paths:
+            st = os.stat(path)
+            stats[os.path.basename(path)] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def _load_range(self, save_dir:str, files:List[str], jobs:int,
+                          date_from:Optional[date],
+                          date_to:Optional[date]) -> bool:
+        """ Load only files from given date range, return True on success.
+
+        Files are selected by date in their names, so older and newer files
+        are never decoded. Running totals up to the range are taken from
+        checkpoint saved by last load of whole history, which can be used
+        only if no older file was added, removed or changed since then.
+        Last file before the range is loaded as well, as daily values of
+        cumulative samples are differences to the previous sample.
+        """
+        dates = [ self._file_date(f) for f in files ]
+        if None in dates:
+            return False
+        older = [ f for f, d in zip(files, dates)
+                  if date_from is not None and d < date_from ]
+        selected = [ f for f, d in zip(files, dates)
+                     if (date_from is None or d >= date_from) and\
+                        (date_to is None or d <= date_to) ]
+        if not selected:
+            return False
+        checkpoint = None
+        if date_from is not None:
+            stored = RunningTotals.load(os.path.join(save_dir,
+                                                     self.CHECKPOINT_NAME))
+            if stored is None:
+                return False
+            checkpoint, stats = stored
+            stats = { n: s for n, s in stats.items()
+                      if (self._file_date(n) or date.min) < date_from }
+            if stats != self._stats(older):
+                self.logger.info("Files older than %s changed since running "\
+                                 "totals were saved" % (date_from, ))
+                return False
+            selected = older[-1:] + selected
+        self.add_many( columns_to_table(columns)
+                       for _, columns in decode_files(selected, jobs) )
+        cube = self._build_cube()
+        if checkpoint is not None and date_to is None:
+            # Move checkpoint to the newest file, so next loads of recent
+            # days don't need whole history. Values are taken before last
+            # samples are cleared, same as in load_data_from_files().
+            try:
+                checkpoint.update(cube.between(date_from))
+                checkpoint.save(os.path.join(save_dir, self.CHECKPOINT_NAME),
+                                self._stats(files))
+            except ValueError as err:
+                self.logger.info("Running totals not updated: %s" % (err, ))
+            self._append_to_store(save_dir, files, cube, date_from)
+        self._use_cube(cube, date_from, date_to, checkpoint)
+        return True
+
+    def _append_to_store(self, save_dir:str, files:List[str],
+                               cube:HistoryCube, date_from:date) -> None:
+        """ Append days of newest files, loaded into the cube, to history
+        store, see load_data_from_store().
+
+        Only files newer than all stored files may be new, and only from the
+        loaded range, stored files can't be changed or removed. Otherwise
+        store is left outdated until next load of whole history.
+        """
+        store = HistoryStore(save_dir)
+        current = self._stats(files)
+        try:
+            stored = store.files()
+            new = [ n for n in current if n not in stored ]
+            if any(current.get(n) != s for n, s in stored.items()):
+                raise ValueError("Stored files changed or removed")
+            newest = max([ self._file_date(n) or date.max for n in stored ],
+                         default=date.min)
+            for n in new:
+                day = self._file_date(n) or date.min
+                if day <= newest or day < date_from:
+                    raise ValueError("File %s is older than stored or loaded "\
+                                     "days" % (n, ))
+            if new:
+                store.append(cube, current)
+        except (OSError, ValueError) as err:
+            self.logger.info("History store %s not updated: %s" %\
+                             (store.path, err))
+
+    def load_data_from_files(self, save_dir:str="",
+                                   use_cache:bool=True,
+                                   jobs:int=1,
+                                   date_from:Optional[date]=None,
+                                   date_to:Optional[date]=None) -> None:
+        """ Load JSON data from files and store it in history attribute.
+
+        Unless disabled, files already decoded in previous runs are taken
+        from ingest cache kept in the same directory and normalized data is
+        saved in history store, see load_data_from_store(), together with
+        running totals. Remaining files are decoded by given number of
+        processes.
+
+        Data may be limited to a date range, both ends included. With
+        caches enabled only files from the range are decoded, using saved
+        running totals, see _load_range(). History holds then only loaded
+        samples. Otherwise whole history is loaded and trimmed.
+        """
         if save_dir == "":
             save_dir = os.path.dirname( os.path.abspath(__file__) )
         COVID19_files = sorted( [   os.path.join(save_dir, f) \
                                     for f in os.listdir(save_dir) \
                                     if "COVID19" in f] )
-        decoder = CovidJsonDecoder()
+        if use_cache and (date_from is not None or date_to is not None):
+            if self._load_range(save_dir, COVID19_files, jobs,
+                                date_from, date_to):
+                return
+            self.logger.info("Loading whole history to select data from "\
+                             "%s to %s" % (date_from, date_to))
+        cache = IngestCache(save_dir) if use_cache else None
+        libraries: Dict[str, LocationsLibrary] = {}
         for f_json in COVID19_files:
-            self.logger.info("Loading data from '%s'" % (f_json))
-            with open(f_json, 'r') as f:
-                _j_data = "".join(f.readlines())
-                self._add_history_data(decoder.decode(_j_data))
-        self._data = self._move_data_dataframe()
+            library = cache.lookup(f_json) if cache else None
+            if library is not None:
+                libraries[f_json] = library
+        missing = [f for f in COVID19_files if f not in libraries]
+        for f_json, (sha256, columns) in zip(missing,
+                                             decode_files(missing, jobs)):
+            if cache:
+                cache.store(f_json, sha256, columns)
+            libraries[f_json] = columns_to_table(columns)
+        self.add_many(libraries[f_json] for f_json in COVID19_files)
+        cube = self._build_cube()
+        # Computed before last samples are cleared, cleared days are not
+        # the last ones when the checkpoint is used
+        totals = RunningTotals.from_cube(cube)
+        if cache:
+            cache.save(COVID19_files)
+            dirty_from = min([ libraries[f].date.date() for f in missing ],
+                             default=None)
+            HistoryStore(save_dir).save(cube, self._stats(COVID19_files),
+                                        dirty_from)
+            totals.save(os.path.join(save_dir, self.CHECKPOINT_NAME),
+                        self._stats(COVID19_files))
+        self._use_cube(cube, date_from, date_to, totals)
+
+    def load_latest_from_files(self, save_dir:str="",
+                                     use_cache:bool=True,
+                                     jobs:int=1,
+                                     days:Optional[int]=None) -> None:
+        """ Load data files of given number of the most recent days.
+
+        By default enough for get_summary() and its indicators, running
+        totals come from data saved by previous loads, see
+        load_data_from_files().
+        """
+        if days is None:
+            # The previous day is needed to spot repeated last samples
+            days = max(2, lookback(SUMMARY_INDICATORS) + 1)
+        if save_dir == "":
+            save_dir = os.path.dirname( os.path.abspath(__file__) )
+        dates = sorted({ self._file_date(f) for f in os.listdir(save_dir)
+                         if "COVID19" in f }, key=lambda d: d or date.min)
+        date_from = dates[-days] if len(dates) >= days else None
+        self.load_data_from_files(save_dir, use_cache, jobs, date_from)
+
+    def load_data_from_store(self, save_dir:str="",
+                                   date_from:Optional[date]=None,
+                                   date_to:Optional[date]=None) -> None:
+        """ Load normalized data saved by load_data_from_files().
+
+        Data is memory mapped from history store in given directory, so no
+        data file is decoded. History of samples is not available then.
+        Data may be limited to a date range, both ends included.
+        ValueError is raised when data files were added, removed or changed
+        since the store was saved.
+        """
+        if save_dir == "":
+            save_dir = os.path.dirname( os.path.abspath(__file__) )
+        store = HistoryStore(save_dir)
+        COVID19_files = [ os.path.join(save_dir, f)
+                          for f in os.listdir(save_dir) if "COVID19" in f ]
+        if store.files() != self._stats(COVID19_files):
+            raise ValueError("Data files changed since history store %s was "\
+                             "saved" % (store.path, ))
+        self._use_cube(store.open(), date_from, date_to)
 
     def to_csv(self) -> None:
         """ Save collected data in CSV file """
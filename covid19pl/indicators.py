@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "26th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import logging
+import numpy as np
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from cube import HistoryCube
+from totals import RunningTotals
+
+# Number of citizens according to stat.gov.pl, Poland has 38354 thousand
+# people and provinces are given as of December 31st, 2019. Population of
+# other locations is estimated from their numbers of cases per 10k citizens.
+POPULATION = {  "POLSKA":               38354000,
+                "DOLNOŚLĄSKIE":         2900163,
+                "KUJAWSKO-POMORSKIE":   2072373,
+                "LUBELSKIE":            2108270,
+                "LUBUSKIE":             1011592,
+                "ŁÓDZKIE":              2454779,
+                "MAŁOPOLSKIE":          3410901,
+                "MAZOWIECKIE":          5423168,
+                "OPOLSKIE":             982626,
+                "PODKARPACKIE":         2127164,
+                "PODLASKIE":            1178353,
+                "POMORSKIE":            2343928,
+                "ŚLĄSKIE":              4517635,
+                "ŚWIĘTOKRZYSKIE":       1233961,
+                "WARMIŃSKO-MAZURSKIE":  1422737,
+                "WIELKOPOLSKIE":        3498733,
+                "ZACHODNIOPOMORSKIE":   1696193}
+
+Compute = Callable[["IndicatorEngine"], np.ndarray]
+
+
+def _sma(window:int) -> Compute:
+    """ Return computation of moving average of new cases """
+    return lambda engine: engine.cube.rolling_mean("total", window)
+
+
+def _week_over_week(engine:"IndicatorEngine") -> np.ndarray:
+    """ Return growth of new cases in last 7 days to 7 days before in % """
+    weekly = engine.cube.rolling_mean("total", 7) * 7
+    result = np.full(weekly.shape, np.nan)
+    previous, current = weekly[:-7], weekly[7:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(current - previous, previous, out=result[7:],
+                  where=previous > 0)
+    return result * 100
+
+
+def _doubling_time(engine:"IndicatorEngine") -> np.ndarray:
+    """ Return number of days running total of cases doubles in.
+
+    Growth of the last 7 days is assumed to continue, days without growth
+    are NaN.
+    """
+    totals = engine.totals["total"].astype(np.float64)
+    result = np.full(totals.shape, np.nan)
+    previous, current = totals[:-7], totals[7:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.log(current / previous)
+        np.divide(7 * np.log(2), ratio, out=result[7:],
+                  where=(previous > 0) & (current > previous))
+    return result
+
+
+# Indicators by name, with number of previous days an indicator of a day
+# is computed from and its computation. Every indicator is a days x
+# locations array, days without enough history are NaN.
+INDICATORS: Dict[str, Tuple[int, Compute]] = {
+    "NC_per_100k":          (0,  lambda e: e.per_100k(e.cube["total"])),
+    "NC_SMA_7":             (6,  _sma(7)),
+    "NC_SMA_14":            (13, _sma(14)),
+    "NC_SMA_21":            (20, _sma(21)),
+    "NC_per_100k_SMA_7":    (6,  lambda e: e.per_100k(e["NC_SMA_7"])),
+    "NC_growth_WoW":        (13, _week_over_week),
+    "doubling_time":        (7,  _doubling_time)}
+
+# Indicators drawn on plots, see plot.SummaryChart
+PLOT_INDICATORS = [ "NC_per_100k", "NC_per_100k_SMA_7",
+                    "NC_SMA_7", "NC_SMA_14", "NC_SMA_21"]
+# Indicators of the latest day displayed and sent by email
+SUMMARY_INDICATORS = ["NC_per_100k_SMA_7", "NC_growth_WoW", "doubling_time"]
+
+
+def lookback(names:Iterable[str]) -> int:
+    """ Return number of previous days given indicators are computed from """
+    return max([ INDICATORS[n][0] for n in names ], default=0)
+
+
+class IndicatorEngine(object):
+    """ Indicators of SARS-CoV-2 spread computed for all locations at once.
+
+    Every indicator is computed from dates x locations arrays of history
+    cube and running totals with vectorized operations, when it is first
+    asked for, and kept until data changes. Every update of data gets a new
+    version number, so results are memoized per indicator and version.
+    Set of indicators may be extended or changed, see INDICATORS.
+    """
+
+    def __init__(self, population:Optional[Dict[str, float]]=None,
+                       indicators:Optional[Dict[str, Tuple[int, Compute]]]=None)\
+                                                                    -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.population = dict(POPULATION, **(population or {}))
+        self.indicators = dict(INDICATORS, **(indicators or {}))
+        self.version: int = 0
+        self._cube: Optional[HistoryCube] = None
+        self._totals: Optional[RunningTotals] = None
+        self._memo: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def update(self, cube:HistoryCube, totals:RunningTotals) -> None:
+        """ Use new data, indicators of previous data are dropped """
+        self._cube = cube
+        self._totals = totals
+        self.version += 1
+        # Indicators of older versions are never asked for again
+        self._memo.clear()
+
+    @property
+    def cube(self) -> HistoryCube:
+        if self._cube is None:
+            raise ValueError("No data to compute indicators from")
+        return self._cube
+
+    @property
+    def totals(self) -> RunningTotals:
+        if self._totals is None:
+            raise ValueError("No data to compute indicators from")
+        return self._totals
+
+    def __getitem__(self, name:str) -> np.ndarray:
+        """ Return days x locations array of an indicator """
+        if name not in self.indicators:
+            raise ValueError("Unknown indicator '%s'" % (name, ))
+        key = (name, self.version)
+        if key not in self._memo:
+            self._memo[key] = self.indicators[name][1](self)
+            self.logger.debug("Indicator %s computed for data version %d" %\
+                              key)
+        return self._memo[key]
+
+    def populations(self) -> np.ndarray:
+        """ Return number of citizens of every location, NaN if unknown """
+        cube = self.cube
+        result = np.full(len(cube.locations), np.nan)
+        for i, loc in enumerate(cube.locations):
+            if loc in self.population:
+                result[i] = self.population[loc]
+                continue
+            total, per_10k = cube["total"][:, i], cube["total_per_10k"][:, i]
+            rows = (total > 0) & (per_10k > 0)
+            if rows.any():
+                result[i] = np.median(total[rows] * 10000 / per_10k[rows])
+        return result
+
+    def per_100k(self, values:np.ndarray) -> np.ndarray:
+        """ Return days x locations values per 100k citizens """
+        return values / (self.populations() / 100000)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "6th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from entities import LocationsLibrary
+from serializers import CovidFastDecoder, columns_to_table, loads_snapshot
+
+
+def _hash(content:bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _decode_chunk(paths:List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    """ Decode files, return their SHA-256 hashes and columnar content """
+    logger = logging.getLogger(__name__)
+    decoder = CovidFastDecoder()
+    decoded = []
+    for path in paths:
+        logger.info("Loading data from '%s'" % (path))
+        with open(path, 'rb') as f:
+            content = f.read()
+        data = loads_snapshot(content, decoder)
+        decoded.append((_hash(content), data))
+    return decoded
+
+
+def decode_files(paths:List[str],
+                 jobs:int=1) -> List[Tuple[str, Dict[str, Any]]]:
+    """ Decode data files, return their SHA-256 hashes and content.
+
+    Content is returned in columnar form. With more than one job, sorted
+    list of files is split into contiguous chunks decoded in worker
+    processes and results are merged in the original order.
+    """
+    if jobs <= 1 or len(paths) < 2:
+        return _decode_chunk(paths)
+    jobs = min(jobs, len(paths))
+    size = -(-len(paths) // jobs)
+    chunks = [paths[i:i+size] for i in range(0, len(paths), size)]
+    decoded = []
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        for chunk in executor.map(_decode_chunk, chunks):
+            decoded.extend(chunk)
+    return decoded
+
+
+class IngestCache(object):
+    """ On-disk cache of already decoded COVID19 data files.
+
+    Cache is a JSON lines file stored in the workspace. First line is a
+    header, every next line is a manifest entry with file name, size,
+    modification time and SHA-256 hash, together with file data in columnar
+    form. New entries are appended, so a run costs as much as the number of
+    new or changed files. Later entries for the same file supersede earlier
+    ones. Corrupted cache is dropped and rebuilt from data files.
+    """
+
+    FILE_NAME = ".ingest_cache.jsonl"
+    VERSION = "1.0.0"
+
+    def __init__(self, save_dir:str) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = os.path.join(save_dir, self.FILE_NAME)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lines: int = 0
+        self._rewrite: bool = False
+        self.hits: int = 0
+        self.misses: int = 0
+        self._load()
+
+    def _header(self) -> Dict[str, str]:
+        return {"_type": self.__class__.__name__, "_version": self.VERSION}
+
+    def _load(self) -> None:
+        """ Read cache manifest, drop it when it can not be trusted """
+        if not os.path.isfile(self.path):
+            self._rewrite = True
+            return
+        try:
+            with open(self.path, 'r') as f:
+                if json.loads(f.readline()) != self._header():
+                    raise ValueError("Unsupported cache format")
+                for line in f:
+                    entry = json.loads(line)
+                    for key in ["name", "size", "mtime", "sha256", "data"]:
+                        if key not in entry:
+                            raise ValueError("Missing '%s' in entry" % key)
+                    self._entries[entry["name"]] = entry
+                    self._lines += 1
+        except (OSError, TypeError, ValueError) as err:
+            self.logger.warning("Ingest cache %s is corrupted (%s), "\
+                                "rebuilding it" % (self.path, err))
+            self._entries = {}
+            self._lines = 0
+            self._rewrite = True
+
+    @staticmethod
+    def _stat(path:str) -> Dict[str, int]:
+        st = os.stat(path)
+        return {"size": st.st_size, "mtime": st.st_mtime_ns}
+
+    def lookup(self, path:str) -> Optional[LocationsLibrary]:
+        """ Return cached data of a file, None if file is new or changed """
+        entry = self._entries.get(os.path.basename(path))
+        stat = self._stat(path)
+        if entry is not None and\
+           (entry["size"], entry["mtime"]) != (stat["size"], stat["mtime"]):
+            # File was touched, trust the content hash and not the timestamp
+            with open(path, 'rb') as f:
+                if _hash(f.read()) == entry["sha256"]:
+                    entry.update(stat)
+                    self._pending.append(entry)
+                else:
+                    entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return columns_to_table(entry["data"])
+
+    def store(self, path:str, sha256:str, data:Dict[str, Any]) -> None:
+        """ Remember decoded content of a file given in columnar form """
+        entry = {"name": os.path.basename(path)}
+        entry.update(self._stat(path))
+        entry["sha256"] = sha256
+        entry["data"] = data
+        self._entries[entry["name"]] = entry
+        self._pending.append(entry)
+
+    def save(self, names:Optional[List[str]]=None) -> None:
+        """ Write pending entries into cache file.
+
+        When list of existing file names is provided entries of removed
+        files are dropped. Whole cache is rewritten if it's new, corrupted
+        or most of its lines are superseded, otherwise entries are appended.
+        """
+        if names is not None:
+            names = [os.path.basename(n) for n in names]
+            stale = set(self._entries) - set(names)
+            for name in stale:
+                del self._entries[name]
+            self._rewrite |= bool(stale)
+        if self._lines + len(self._pending) > 2 * len(self._entries):
+            self._rewrite = True
+        if self._rewrite:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(json.dumps(self._header()) + "\n")
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.path)
+            self._lines = len(self._entries)
+        elif self._pending:
+            with open(self.path, 'a') as f:
+                for entry in self._pending:
+                    f.write(json.dumps(entry) + "\n")
+            self._lines += len(self._pending)
+        self._pending = []
+        self._rewrite = False
+        self.logger.info("Ingest cache %s: %d hits, %d misses" %\
+                         (self.path, self.hits, self.misses))
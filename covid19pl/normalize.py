@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "18th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from datetime import datetime
+import numpy as np
+from typing import Any, Dict, List
+
+from entities import LOCATION_DTYPES, LocationsTable
+
+PROVINCE_FIELD = "Województwo"
+
+# Fields of gov.pl 'parsedData' records mapped on LocationEntity fields,
+# for every LocationEntity version.
+SCHEMAS = {
+    # Data from 03.03.2020 - 23.11.2020, values are totals
+    "1.0.0": {  "total":            "Liczba",
+                "dead":             "Liczba zgonów"},
+    # Data since 24.11.2020, values are daily deltas
+    "1.1.0": {  "total":            "Liczba",
+                "total_per_10k":    "Liczba na 10 tys. mieszkańców",
+                "dead":             "Wszystkie przypadki śmiertelne",
+                "dead_by_covid":    "Przypadki śmiertelne w wyniku Covid",
+                "dead_with_covid":  "Przypadki śmiertelne w wyniku chorób "\
+                                    "współistniejących"}}
+
+# Fields which are published empty when there is nothing to report
+OPTIONAL_FIELDS = ["dead", "dead_by_covid", "dead_with_covid"]
+
+
+def detect_schema(records:List[Dict[str, str]]) -> str:
+    """ Return LocationEntity version matching field names of records.
+
+    When more schemas match, the one with most fields wins.
+    """
+    names = set()
+    for record in records:
+        names.update(record)
+    matching = [ (len(fields), version)
+                 for version, fields in SCHEMAS.items()
+                 if set(fields.values()) <= names ]
+    if not matching:
+        raise ValueError("Unknown parsedData schema with fields %s" %\
+                         sorted(names))
+    return max(matching)[1]
+
+
+def _numbers(values:List[str], dtype:Any, optional:bool) -> np.ndarray:
+    """ Convert Polish formatted numbers into typed array.
+
+    Whole column is joined and cleaned with a single pass of every replace,
+    thousands separators are dropped and decimal commas become dots.
+    """
+    if not values:
+        return np.zeros(0, dtype=dtype)
+    text = "\n".join(values).replace(" ", "").replace("\xa0", "")
+    if dtype is np.float64:
+        text = text.replace(",", ".")
+    values = text.split("\n")
+    if optional:
+        values = [ v if v else "0" for v in values ]
+    try:
+        return np.array(values, dtype=dtype)
+    except ValueError as err:
+        raise ValueError("Malformed number in parsedData: %s" % (err, ))
+
+
+def normalize_parsed_data(records:List[Dict[str, str]],
+                          date:datetime) -> LocationsTable:
+    """ Convert gov.pl 'parsedData' records into sorted LocationsTable.
+
+    Schema is detected once per payload, every field is converted as a
+    whole column. Records without province or with links instead of data
+    are skipped.
+    """
+    records = [ r for r in records if r.get(PROVINCE_FIELD) and\
+                                      "https" not in r[PROVINCE_FIELD] ]
+    version = detect_schema(records) if records else "1.1.0"
+    schema = SCHEMAS[version]
+    size = len(records)
+    columns: Dict[str, Any] = {}
+    for name, dtype in LOCATION_DTYPES.items():
+        if name in schema:
+            columns[name] = _numbers([ r[schema[name]] for r in records ],
+                                     dtype, name in OPTIONAL_FIELDS)
+        elif dtype is not object:
+            columns[name] = np.zeros(size, dtype=dtype)
+    columns["province"] = [ r[PROVINCE_FIELD] for r in records ]
+    columns["date"] = np.full(size, np.datetime64(date, "us"))
+    columns["VERSION"] = [version] * size
+    table = LocationsTable.from_columns("1.0.0", date, columns)
+    table.sort()
+    return table
@@ -9,163 +9,459 @@ __maintainer__  = "oscarsierraproject.eu"
 __email__       = "oscarsierraproject@protonmail.com"
 __status__      = "Development"
 
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import hashlib
+import json
 import logging
-from matplotlib import pyplot as plt
+import matplotlib
+from matplotlib import dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+import numpy as np
 import os
 import pandas as pd
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
-def plot_summary_data(data: Dict[str, pd.DataFrame], workspace:str) ->None:
-    """ Create a plots showing summary of gathered data """
-    df_polska = pd.DataFrame()
-    province = {"index": [], "values": []}
-    for loc, dataframe in data.items():
-        if loc == "POLSKA":
-            df_polska = dataframe
-            # According to stat.gov.pl Poland has 38354 thousand people
-            df_polska['NC_per_100k'] = df_polska["total"].div(38354000/100000)
-            df_polska['NC_per_100k_SMA_7'] = df_polska["NC_per_100k"].rolling(window=7).mean()
-            df_polska['NC_SMA_7'] = df_polska["total"].rolling(window=7).mean()
-            df_polska['NC_SMA_14'] = df_polska["total"].rolling(window=14).mean()
-            df_polska['NC_SMA_21'] = df_polska["total"].rolling(window=21).mean()
+from indicators import PLOT_INDICATORS
+
+# Figures are built with the object-oriented API and drawn on Agg canvas,
+# without any pyplot state, so figures can be rendered in worker processes
+# and are reused for every plot a process renders.
+
+# Version of the way plots are drawn, change it when drawing code changes,
+# so plots rendered by the previous version are not taken from cache
+STYLE_VERSION = 2
+# Plots of more days are drawn in compact mode: dates on x axis are ticked
+# weekly or monthly and series longer than width of a panel in pixels are
+# downsampled, so rendering time and size of a plot don't grow with history.
+# Daily mode labels every day, see SummaryChart.
+COMPACT_FROM_DAYS = 180
+PLOT_MODES = ["auto", "daily", "compact"]
+
+
+def plot_file_name(loc:str) -> str:
+    """ Return name of file with plot of a location """
+    if loc == "POLSKA":
+        return "covid19pl.png"
+    return f"covid19pl_{loc}.png"
+
+
+class RenderCache(object):
+    """ On-disk cache of rendered plots.
+
+    For every plot file in workspace cache keeps SHA-256 hash of everything
+    the plot was rendered from: location, its data series, indicators and
+    date range, values of provinces panel and style parameters. Plot with
+    the same hash whose file is still in place doesn't have to be rendered
+    again.
+    """
+
+    FILE_NAME = ".render_cache.json"
+    VERSION = "1.0.0"
+
+    def __init__(self, workspace:str, force:bool=False) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = os.path.join(workspace, self.FILE_NAME)
+        # Forced cache never finds a plot, but remembers rendered ones
+        self.force = force
+        self.hits: int = 0
+        self.misses: int = 0
+        self._plots: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if data["_type"] != self.__class__.__name__ or\
+                   data["_version"] != self.VERSION:
+                    raise ValueError("Unsupported cache format")
+                self._plots = dict(data["plots"])
+            except (OSError, KeyError, TypeError, ValueError) as err:
+                self.logger.warning("Render cache %s is corrupted (%s), "\
+                                    "dropping it" % (self.path, err))
+
+    @staticmethod
+    def key(loc:str, dataframe:pd.DataFrame,
+            province:Dict[str, List[Any]], mode:str="auto") -> str:
+        """ Return hash of everything plot of a location is rendered from """
+        sha256 = hashlib.sha256()
+        sha256.update(json.dumps({
+                        "location":     loc,
+                        "province":     [ province["index"],
+                                          [ int(v) for v in
+                                            province["values"] ]],
+                        "style":        STYLE_VERSION,
+                        "mode":         mode,
+                        "matplotlib":   matplotlib.__version__ }).encode())
+        sha256.update("\n".join(str(d) for d in dataframe["date"]).encode())
+        for column in ["total", "total_per_10k", "total_sum"] +\
+                      PLOT_INDICATORS:
+            sha256.update(np.ascontiguousarray(dataframe[column]).tobytes())
+        return sha256.hexdigest()
+
+    def lookup(self, plot_file:str, key:str) -> bool:
+        """ Return True if plot file was rendered from data with given key """
+        entry = self._plots.get(os.path.basename(plot_file))
+        if not self.force and entry is not None and\
+           entry["sha256"] == key and os.path.isfile(plot_file) and\
+           os.path.getsize(plot_file) == entry["size"]:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def update(self, plot_file:str, key:str) -> None:
+        """ Remember key of a freshly rendered plot file """
+        self._plots[os.path.basename(plot_file)] = {
+                        "sha256": key,
+                        "size": os.path.getsize(plot_file)}
+
+    def save(self) -> None:
+        """ Store cache in its file """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({ "_type": self.__class__.__name__,
+                        "_version": self.VERSION,
+                        "plots": self._plots}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def lttb(x:np.ndarray, y:np.ndarray,
+         threshold:int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Downsample series to threshold points, keeping its shape.
+
+    Largest-Triangle-Three-Buckets: first and last points are kept, points
+    in between are split into buckets and from every bucket the point
+    forming the largest triangle with the point kept from the previous
+    bucket and the average of the next bucket is kept. Dates are accepted
+    as x values.
+    """
+    n = len(x)
+    if threshold < 3 or n <= threshold:
+        return x, y
+    xf = (x.astype(np.int64) if x.dtype.kind == "M" else x).astype(float)
+    yf = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xf[stop:next_stop].mean()
+        avg_y = yf[stop:next_stop].mean()
+        area = np.abs((xf[a] - avg_x) * (yf[start:stop] - yf[a]) -\
+                      (xf[a] - xf[start:stop]) * (avg_y - yf[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return x[kept], np.asarray(y)[kept]
+
+
+def _series(x:np.ndarray, values:pd.Series,
+            limit:Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Return points of a series to draw, at most limit of them if given """
+    y = np.asarray(values, dtype=float)
+    if limit is None:
+        return x, y
+    # Moving averages start with NaNs, they are not drawn anyway
+    drawn = ~np.isnan(y)
+    return lttb(x[drawn], y[drawn], limit)
+
+
+def _is_compact(mode:str, days:int) -> bool:
+    """ Return True if plot of given number of days is drawn compact """
+    if mode not in PLOT_MODES:
+        raise ValueError("Unknown plot mode '%s'" % (mode, ))
+    if mode == "auto":
+        return days > COMPACT_FROM_DAYS
+    return mode == "compact"
+
+
+def _date_axis(ax:Any, df:pd.DataFrame, x:np.ndarray,
+               plot_width:int, compact:bool) -> None:
+    """ Label x axis of a panel with dates """
+    if compact:
+        span = int((x[-1] - x[0]) / np.timedelta64(1, "D"))
+        if span <= 26 * 7:
+            locator = mdates.WeekdayLocator(byweekday=mdates.MO)
         else:
-            province["index"].append(loc)
-            province["values"].append(dataframe.iloc[-1]["total"])
-    df_polska.reset_index(inplace=True,drop=True)
+            # At most about 18 labels, whatever the length of history,
+            # every January is labeled with its year
+            months = -(-span // (18 * 30))
+            step = next((i for i in [1, 2, 3, 4, 6] if i >= months), 12)
+            locator = mdates.MonthLocator(bymonth=range(1, 13, step))
+        ax.xaxis.set_major_locator(locator)
+        # Short horizontal labels, year is shown only when it changes
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.set_xlim(xmin=x[0])
+        return
+    labels = [ str(d) for d in df["date"] ]
+    if plot_width >= 15:
+        # Show label on every week, labels of reused ticks are only replaced
+        labels = [ l if idx % 7 == 0 else "" for idx, l in enumerate(labels) ]
+    ax.set_xticks(df.index)
+    ax.set_xticklabels(labels, rotation=90)
+    ax.set_xlim(xmin=0)
+
+
+def _fit(ax:Any, lines:List[Any]) -> None:
+    """ Fit view limits of a panel to data of given lines.
+
+    Other artists, as threshold bands, are not taken into account, same as
+    in a panel autoscaled before they are added.
+    """
+    ax.dataLim.set_points(Bbox.null().get_points())
+    ax.ignore_existing_data_limits = True
+    for line in lines:
+        ax.update_datalim(line.get_xydata())
+    ax.set_autoscale_on(True)
+    ax.autoscale_view()
 
-    # Prepare the plot depending on the size of dataframe
-    if df_polska.size / 300 < 1:
-        plot_width = 7
-    elif df_polska.size / 300 < 2:
-        plot_width = 10
-    else:
-        plot_width = 15
 
-    # Set plot layout
-    fig, ax = plt.subplots(nrows=4, ncols=1, sharex=False)
-    fig.set_size_inches(plot_width,16)
-    ax[0].set_title(f"COVID19 cases in Poland {datetime.now()}\n")
+class SummaryChart(object):
+    """ Figure with 4 panels summary of a location, built once and reused.
 
-    # Prepare 1st plot: Safety rules thresholds
-    ax[0].plot( df_polska.index,
-                df_polska["NC_per_100k"],
+    Layout, threshold bands, labels, grids, legends and all lines are
+    created with the chart. Update of the chart only swaps data of lines,
+    rescales axes, labels dates and moves annotations, so a process
+    rendering many locations, or redrawing after every new snapshot, pays
+    only for drawing that depends on data.
+
+    Data frame has to hold PLOT_INDICATORS, see indicators module. Last
+    panel shows new cases of every province, location's own value is
+    highlighted. Compact chart ticks weeks or months and downsamples long
+    series, see PLOT_MODES.
+    """
+
+    def __init__(self, compact:bool) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.compact = compact
+        self.fig = Figure()
+        FigureCanvasAgg(self.fig)
+        ax = self.fig.subplots(nrows=4, ncols=1, sharex=False)
+        self.ax = ax
+        if compact:
+            for panel in ax[:3]:
+                # Lines are created empty, dates need their converter first
+                panel.xaxis.update_units(np.datetime64("2020-03-03"))
+        # Lines of data series by column, for every time panel
+        self.series: List[Dict[str, Any]] = [{}, {}, {}]
+        self.last: List[Any] = []
+
+        # Prepare 1st plot: Safety rules thresholds
+        self.series[0]["NC_per_100k"], = ax[0].plot([], [],
                 color="black", marker='.', linestyle='none',
                 label="New cases per 100k citizens")
-    ax[0].plot( df_polska.index,
-                df_polska["NC_per_100k_SMA_7"],
+        self.series[0]["NC_per_100k_SMA_7"], = ax[0].plot([], [],
                 color="black", marker=',', linestyle='solid',
                 label="New cases per 100k citizens, SMA7")
-    ax[0].set_xticks(df_polska.index)
-    ax[0].set_xticklabels(df_polska["date"])
-    for l in ax[0].get_xticklabels():
-        l.set_rotation(90)
-    if plot_width >= 15:
-        # Show label on every week
-        for idx, xlabel_i in enumerate(ax[0].axes.get_xticklabels()):
-            if idx % 7 != 0:
-                xlabel_i.set_visible(False)
-                xlabel_i.set_fontsize(0.0)
-    ax[0].set_ylabel("NUMBER OF NEW INFECTIONS\nPER 100k CITIZENS")
-    ax[0].set_xlim(xmin=0)
-    ax[0].set_ylim(ymin=0)
-    ax[0].grid(b=True, which="both", axis="both", linestyle='dotted')
-    ax[0].legend()
-    ax[0].annotate ("%.2f"% df_polska["NC_per_100k_SMA_7"].iloc[-1],
-                            ( df_polska.index[-1],
-                              df_polska["NC_per_100k_SMA_7"].iloc[-1]),
-                            textcoords="offset points",
-                            color='black',
-                            xytext=(15, 0), ha='center')
-    ax[0].axhspan(0, 10, facecolor='green', alpha=0.5)
-    ax[0].axhspan(10, 25, facecolor='yellow', alpha=0.5)
-    ax[0].axhspan(25, 50, facecolor='red', alpha=0.5)
-    ax[0].axhspan(50, 70, facecolor='violet', alpha=0.5)
-    ax[0].axhspan(70, 150, facecolor='grey', alpha=0.5)
-
-    # Prepare 2nd plot: TOTAL CASES REPORTED ----------------------------------
-    ax[1].plot( df_polska.index,
-                df_polska["total_sum"],
-                color="red", marker=',', linestyle='solid',
-                label="Cała Polska")
-    ax[1].set_xticks(df_polska.index)
-    ax[1].set_xticklabels(df_polska["date"])
-    for l in ax[1].get_xticklabels():
-        l.set_rotation(90)
-    if plot_width >= 15:
-        # Show label on every week
-        for idx, xlabel_i in enumerate(ax[1].axes.get_xticklabels()):
-            if idx % 7 != 0:
-                xlabel_i.set_visible(False)
-                xlabel_i.set_fontsize(0.0)
-    ax[1].set_ylabel("TOTAL CASES REPORTED")
-    ax[1].set_xlim(xmin=0)
-    ax[1].set_ylim(ymin=0)
-    ax[1].grid(b=True, which="both", axis="both", linestyle='dotted')
-    ax[1].legend()
-    ax[1].annotate ("%.0f"% df_polska["total_sum"].iloc[-1],
-                            ( df_polska.index[-1],
-                              df_polska["total_sum"].iloc[-1]),
-                            textcoords="offset points",
-                           xytext=(5, -10), ha='center')
-
-    # Prepare 3rd plot: NUMBER OF NEW INFECTIONS ------------------------------
-    ax[2].plot( df_polska.index,
-                df_polska["total"],
+        ax[0].set_ylabel("NUMBER OF NEW INFECTIONS\nPER 100k CITIZENS")
+        ax[0].grid(visible=True, which="both", axis="both", linestyle='dotted')
+        ax[0].legend()
+        self.last.append(ax[0].annotate("", (0, 0),
+                                        textcoords="offset points",
+                                        color='black',
+                                        xytext=(15, 0), ha='center'))
+        ax[0].axhspan(0, 10, facecolor='green', alpha=0.5)
+        ax[0].axhspan(10, 25, facecolor='yellow', alpha=0.5)
+        ax[0].axhspan(25, 50, facecolor='red', alpha=0.5)
+        ax[0].axhspan(50, 70, facecolor='violet', alpha=0.5)
+        ax[0].axhspan(70, 150, facecolor='grey', alpha=0.5)
+
+        # Prepare 2nd plot: TOTAL CASES REPORTED ------------------------------
+        self.series[1]["total_sum"], = ax[1].plot([], [],
+                color="red", marker=',', linestyle='solid')
+        ax[1].set_ylabel("TOTAL CASES REPORTED")
+        ax[1].grid(visible=True, which="both", axis="both", linestyle='dotted')
+        self.last.append(ax[1].annotate("", (0, 0),
+                                        textcoords="offset points",
+                                        xytext=(5, -10), ha='center'))
+
+        # Prepare 3rd plot: NUMBER OF NEW INFECTIONS --------------------------
+        self.series[2]["total"], = ax[2].plot([], [],
                 color="black", marker='.', linestyle='none',
                 label="New cases")
-    ax[2].plot( df_polska.index,
-                df_polska["NC_SMA_7"],
+        self.series[2]["NC_SMA_7"], = ax[2].plot([], [],
                 color="green", marker=',', linestyle='solid',
                 label="New cases, SMA7")
-    ax[2].plot( df_polska.index,
-                df_polska["NC_SMA_14"],
+        self.series[2]["NC_SMA_14"], = ax[2].plot([], [],
                 color="orange", marker=',', linestyle='solid',
                 label="New cases, SMA14")
-    ax[2].plot( df_polska.index,
-                df_polska["NC_SMA_21"],
+        self.series[2]["NC_SMA_21"], = ax[2].plot([], [],
                 color="magenta", marker=',', linestyle='solid',
                 label="New cases, SMA21")
-    ax[2].set_xticks(df_polska.index)
-    ax[2].set_xticklabels(df_polska["date"])
-    for l in ax[2].get_xticklabels():
-        l.set_rotation(90)
-    if plot_width >= 15:
-        # Show label on every week
-        for idx, xlabel_i in enumerate(ax[2].axes.get_xticklabels()):
-            if idx % 7 != 0:
-                xlabel_i.set_visible(False)
-                xlabel_i.set_fontsize(0.0)
-    ax[2].set_ylabel("NUMBER OF NEW INFECTIONS")
-    ax[2].set_xlim(xmin=0)
-    ax[2].set_ylim(ymin=0)
-    ax[2].set_title("")
-    ax[2].grid(b=True, which="both", axis="both", linestyle='dotted')
-    ax[2].legend()
-    ax[2].annotate ("%.0f"% df_polska["total"].iloc[-1],
-                            ( df_polska.index[-1],
-                              df_polska["total"].iloc[-1]),
-                            textcoords="offset points",
-                            xytext=(0, -10), ha='center')
-    # Prepare 4th plot: NUMBER OF NEW INFECTIONS ------------------------------
-    ax[3].plot( province["values"],
-                color="purple", marker='.', linestyle='none',
-                label="New cases on {}".format(df_polska["date"].iloc[-1]))
-    ax[3].set_xticks(range(len(province["index"])))
-    ax[3].set_xticklabels(province["index"])
-    for l in ax[3].get_xticklabels():
-        l.set_rotation(90)
-    ax[3].set_ylabel("NEW INFECTIONS")
-    ax[3].set_xlim(xmin=0)
-    ax[3].set_ylim(ymin=0)
-    ax[3].set_title("")
-    ax[3].grid(b=True, which="both", axis="both", linestyle='dotted')
-    ax[3].legend()
-    for x, y in enumerate(province["values"]):
-        ax[3].annotate ("%d"% y, (x, y),
-                                textcoords="offset points",
-                                xytext=(0, -10), ha='center')
-    # Save plot in a file -----------------------------------------------------
-    plot_file = os.path.join(workspace, "covid19pl.png")
-    fig.savefig(plot_file)
-    print("Saving plot into a file %s" % (plot_file, ))
+        ax[2].set_ylabel("NUMBER OF NEW INFECTIONS")
+        ax[2].set_title("")
+        ax[2].grid(visible=True, which="both", axis="both", linestyle='dotted')
+        ax[2].legend()
+        self.last.append(ax[2].annotate("", (0, 0),
+                                        textcoords="offset points",
+                                        xytext=(0, -10), ha='center'))
+
+        # Prepare 4th plot: NUMBER OF NEW INFECTIONS --------------------------
+        self.province, = ax[3].plot([], [],
+                color="purple", marker='.', linestyle='none')
+        self.highlight, = ax[3].plot([], [],
+                color="red", marker='o', linestyle='none')
+        ax[3].set_ylabel("NEW INFECTIONS")
+        ax[3].set_title("")
+        ax[3].grid(visible=True, which="both", axis="both", linestyle='dotted')
+        self.province_index: List[str] = []
+        self.province_labels: List[Any] = []
+
+    def update(self, loc:str, df:pd.DataFrame,
+                     province:Dict[str, List[Any]]) -> None:
+        """ Show data of a location, frame has to be indexed from 0 """
+        ax = self.ax
+        # Prepare the plot depending on the size of dataframe
+        if df.size / 300 < 1:
+            plot_width = 7
+        elif df.size / 300 < 2:
+            plot_width = 10
+        else:
+            plot_width = 15
+        name = "Poland" if loc == "POLSKA" else loc
+        self.fig.set_size_inches(plot_width,16)
+        ax[0].set_title(f"COVID19 cases in {name} {datetime.now()}\n")
+        if self.compact:
+            x = np.array(df["date"], dtype="datetime64[D]")
+            # Panels have the same width, there is no use of more points
+            limit: Optional[int] = int(ax[0].get_position().width *\
+                                       plot_width * self.fig.dpi)
+        else:
+            x = np.asarray(df.index)
+            limit = None
+
+        self.series[1]["total_sum"].set_label(
+                                    "Cała Polska" if loc == "POLSKA" else loc)
+        for panel, series in zip(ax, self.series):
+            for column, line in series.items():
+                line.set_data(*_series(x, df[column], limit))
+            _fit(panel, list(series.values()))
+            _date_axis(panel, df, x, plot_width, self.compact)
+            panel.set_ylim(ymin=0)
+        ax[1].legend()
+        for annotation, column, fmt in zip(self.last,
+                                           [ "NC_per_100k_SMA_7",
+                                             "total_sum", "total"],
+                                           [ "%.2f", "%.0f", "%.0f"]):
+            annotation.set_text(fmt % df[column].iloc[-1])
+            annotation.xy = (x[-1], df[column].iloc[-1])
+
+        values = province["values"]
+        self.province.set_data(range(len(values)), values)
+        self.province.set_label("New cases on {}".format(df["date"].iloc[-1]))
+        if loc in province["index"]:
+            idx = province["index"].index(loc)
+            self.highlight.set_data([idx], [values[idx]])
+            self.highlight.set_label(loc)
+        else:
+            # Labels starting with underscore are left out of legend
+            self.highlight.set_data([], [])
+            self.highlight.set_label("_highlight")
+        if self.province_index != province["index"]:
+            self.province_index = list(province["index"])
+            ax[3].set_xticks(range(len(self.province_index)))
+            ax[3].set_xticklabels(self.province_index)
+            for l in ax[3].get_xticklabels():
+                l.set_rotation(90)
+        _fit(ax[3], [self.province, self.highlight])
+        ax[3].set_xlim(xmin=0)
+        ax[3].set_ylim(ymin=0)
+        ax[3].legend()
+        while len(self.province_labels) > len(values):
+            self.province_labels.pop().remove()
+        while len(self.province_labels) < len(values):
+            self.province_labels.append(ax[3].annotate("", (0, 0),
+                                        textcoords="offset points",
+                                        xytext=(0, -10), ha='center'))
+        for x_i, (label, y) in enumerate(zip(self.province_labels, values)):
+            label.set_text("%d"% y)
+            label.xy = (x_i, y)
+
+    def save(self, plot_file:str) -> None:
+        """ Save chart into a PNG file.
+
+        File is replaced atomically, readers never see a partially written
+        plot.
+        """
+        self.fig.savefig(plot_file + ".tmp", format="png")
+        os.replace(plot_file + ".tmp", plot_file)
+
+
+# Charts of this process by compact mode, kept between calls of
+# render_summary(), so worker processes build every layout only once
+_charts: Dict[bool, SummaryChart] = {}
+
+
+def render_summary(loc:str, dataframe:pd.DataFrame,
+                   province:Dict[str, List[Any]],
+                   workspace:str, mode:str="auto") -> Tuple[str, float]:
+    """ Render summary plot of a location into a file in workspace.
+
+    Mode is one of PLOT_MODES. Return path of the file and time of
+    rendering in seconds.
+    """
+    start = time.perf_counter()
+    df = dataframe.reset_index(drop=True)
+    compact = _is_compact(mode, len(df))
+    if compact not in _charts:
+        _charts[compact] = SummaryChart(compact)
+    _charts[compact].update(loc, df, province)
+    plot_file = os.path.join(workspace, plot_file_name(loc))
+    _charts[compact].save(plot_file)
+    return plot_file, time.perf_counter() - start
+
+
+def plot_summary_data(data: Dict[str, pd.DataFrame], workspace:str,
+                      jobs:Optional[int]=None,
+                      force:bool=False,
+                      mode:str="auto") -> Dict[str, float]:
+    """ Create plots showing summary of gathered data.
+
+    Data frames have to hold PLOT_INDICATORS, see
+    Covid19HistoryContainer.get_data_to_analyse(). Plot of Poland and a plot
+    of every province are rendered by given number of processes, by default
+    one per CPU. Plots rendered from the
+    same data before are skipped, see RenderCache, unless rendering is
+    forced. Mode is one of PLOT_MODES, see SummaryChart. Return render
+    time of every rendered plot file in seconds.
+    """
+    logger = logging.getLogger(__name__)
+    province = {"index": [], "values": []}
+    for loc, dataframe in data.items():
+        if loc != "POLSKA":
+            province["index"].append(loc)
+            province["values"].append(dataframe.iloc[-1]["total"])
+    cache = RenderCache(workspace, force)
+    keys = {}
+    for loc, dataframe in data.items():
+        plot_file = os.path.join(workspace, plot_file_name(loc))
+        if dataframe.empty:
+            continue
+        # Auto mode draws the same plot as the mode it resolves to
+        keys[loc] = cache.key(loc, dataframe, province,
+                              "compact" if _is_compact(mode, len(dataframe))
+                              else "daily")
+        if cache.lookup(plot_file, keys[loc]):
+            keys.pop(loc)
+    jobs = min(jobs or os.cpu_count() or 1, len(keys))
+    args = [ (loc, data[loc], province, workspace, mode) for loc in keys ]
+    if jobs <= 1:
+        results = [ render_summary(*a) for a in args ]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(render_summary, *zip(*args)))
+    times = {}
+    for loc, (plot_file, seconds) in zip(keys, results):
+        print("Saving plot into a file %s" % (plot_file, ))
+        logger.info("Plot %s rendered in %.3f s" % (plot_file, seconds))
+        cache.update(plot_file, keys[loc])
+        times[plot_file] = seconds
+    cache.save()
+    print("Plot cache %s: %d hits, %d misses" % (cache.path, cache.hits,
+                                                cache.misses))
+    return times
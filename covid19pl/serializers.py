@@ -9,12 +9,66 @@ __maintainer__  = "oscarsierraproject.eu"
 __email__       = "oscarsierraproject@protonmail.com"
 __status__      = "Development"
 
+import dataclasses
 from datetime import datetime
+import gzip
+import io
 import json
 import logging
 import logging.config
-from typing import Any, List
-from entities import LocationEntity, LocationsLibrary
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from entities import LocationEntity, LocationRow, LocationsLibrary,\
+                     LocationsTable
+
+# Fields of LocationEntity, in order of declaration, stored column-wise
+ENTITY_FIELDS = [f.name for f in dataclasses.fields(LocationEntity)]
+
+# Formats of data files with their file name extensions:
+#   json  - legacy, indented JSON with every object tagged with its type
+#   jsonz - gzip compressed, compact JSON with items in columnar form
+SNAPSHOT_FORMATS = {"json": ".json", "jsonz": ".json.gz"}
+COLUMNS_TYPE = "LocationsColumns"
+COLUMNS_VERSION = "1.0.0"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def library_to_columns(library:LocationsLibrary) -> Dict[str, Any]:
+    """ Convert LocationsLibrary into JSON friendly columnar form """
+    items = library.items
+    columns: Dict[str, List[Any]] = {}
+    for name in ENTITY_FIELDS:
+        if isinstance(library, LocationsTable):
+            columns[name] = library.column(name).astype(object).tolist()
+        else:
+            columns[name] = [getattr(item, name) for item in items]
+    columns["date"] = [d.isoformat(sep=" ") for d in columns["date"]]
+    return {"VERSION":  library.VERSION,
+            "date":     library.date.isoformat(sep=" "),
+            "items":    columns}
+
+
+def columns_to_library(data:Dict[str, Any]) -> LocationsLibrary:
+    """ Restore LocationsLibrary from its columnar form """
+    columns = dict(data["items"])
+    # All items of a snapshot share few timestamps, parse each only once
+    dates = {d: datetime.fromisoformat(d) for d in set(columns["date"])}
+    columns["date"] = [dates[d] for d in columns["date"]]
+    items = [ LocationEntity(*row)
+              for row in zip(*[columns[name] for name in ENTITY_FIELDS]) ]
+    return LocationsLibrary(VERSION=data["VERSION"],
+                            date=datetime.fromisoformat(data["date"]),
+                            items=items)
+
+
+def columns_to_table(data:Dict[str, Any]) -> LocationsTable:
+    """ Create LocationsTable straight from columnar form """
+    columns = dict(data["items"])
+    columns["date"] = np.array(columns["date"], dtype="datetime64[us]")
+    return LocationsTable.from_columns(data["VERSION"],
+                                       datetime.fromisoformat(data["date"]),
+                                       columns)
+
 
 class CovidJsonDecoder(json.JSONDecoder):
     """ JSON data decoder prepared to handle specific COVID19 JSON data. """
@@ -52,14 +106,256 @@ class CovidJsonDecoder(json.JSONDecoder):
             raise json.JSONDecoderError(msg)
 
 
+class CovidFastDecoder(object):
+    """ JSON data decoder writing COVID19 data straight into columnar form.
+
+    Knows the layout of LocationsLibrary and LocationEntity in versions
+    1.0.0 and 1.1.0, so data is parsed by the C accelerated JSON parser
+    without per-object hooks and no entities are created on the way.
+    Parsed dates are cached. Data with unknown '_type' or entity version
+    is handed over to CovidJsonDecoder.
+    """
+
+    ENTITY_VERSIONS = ["1.0.0", "1.1.0"]
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._dates: Dict[Tuple[str, str], str] = {}
+
+    def _date(self, obj:Any) -> Optional[str]:
+        if not isinstance(obj, dict) or obj.get("_type") != "datetime":
+            return None
+        key = (obj["value"], obj["_format"])
+        if key not in self._dates:
+            self._dates[key] = datetime.strptime(*key).isoformat(sep=" ")
+        return self._dates[key]
+
+    def _columns(self, obj:Any) -> Optional[Dict[str, Any]]:
+        """ Return data in columnar form, None if layout is not known """
+        if not isinstance(obj, dict) or obj.get("_type") != "LocationsLibrary":
+            return None
+        value = obj["value"]
+        date = self._date(value["date"])
+        if date is None:
+            return None
+        columns: Dict[str, List[Any]] = {name: [] for name in ENTITY_FIELDS}
+        for item in value["items"]:
+            if not isinstance(item, dict) or\
+               item.get("_type") != "LocationEntity":
+                return None
+            v = item["value"]
+            item_date = self._date(v["date"])
+            if item_date is None or v["VERSION"] not in self.ENTITY_VERSIONS:
+                return None
+            columns["province"].append(v["province"])
+            columns["total"].append(int(v["total"]))
+            columns["dead"].append(int(v["dead"]))
+            columns["recovered"].append(int(v["recovered"]))
+            if v["VERSION"] == "1.1.0":
+                columns["total_per_10k"].append(float(v["total_per_10k"]))
+                columns["dead_by_covid"].append(int(v["dead_by_covid"]))
+                columns["dead_with_covid"].append(int(v["dead_with_covid"]))
+            else:
+                columns["total_per_10k"].append(0)
+                columns["dead_by_covid"].append(0)
+                columns["dead_with_covid"].append(0)
+            columns["date"].append(item_date)
+            columns["VERSION"].append(v["VERSION"])
+        return {"VERSION": value["VERSION"], "date": date, "items": columns}
+
+    def decode(self, s:str) -> Dict[str, Any]:
+        """ Decode JSON document into LocationsLibrary in columnar form """
+        columns = self._columns(json.loads(s))
+        if columns is None:
+            self.logger.debug("Unknown data layout, using hook based decoder")
+            columns = library_to_columns(CovidJsonDecoder().decode(s))
+        return columns
+
+
+class _NotSupported(Exception):
+    """ Object can not be serialized by CovidJsonEncoder fast path """
+
+
 class CovidJsonEncoder(json.JSONEncoder):
-    """ Class serializing COVID-19 LocationsLibrary into JSON format. """
+    """ Class serializing COVID-19 LocationsLibrary into JSON format.
+
+    LocationsLibrary given to encode() is serialized in a single pass.
+    Without indentation it is turned into plain dicts and lists handed over
+    to the C accelerated encoder. With indentation the text is assembled
+    from templates with precomputed key order, strings are escaped by the
+    C accelerated functions. Date strings are cached in both cases. Output
+    is the same as produced by default(), which handles everything else.
+    """
 
     DATE_FORMAT = "%Y-%m-%d"
     TIME_FORMAT = "%H:%M:%S"
+    DATETIME_FORMAT = "%s %s" % (DATE_FORMAT, TIME_FORMAT)
+    LIBRARY_FIELDS = ["VERSION", "date", "items"]
+
+    def __init__(self, *args, **kwargs):
+        super(CovidJsonEncoder, self).__init__(*args, **kwargs)
+        self._dates: Dict[datetime, Dict[str, str]] = {}
+        self._date_texts: Dict[Tuple[datetime, int], str] = {}
+        self._templates: Dict[Tuple[Any, ...], str] = {}
+        self._string = json.encoder.encode_basestring_ascii\
+                       if self.ensure_ascii else json.encoder.encode_basestring
+        self._scalars = {   str:    self._string,
+                            int:    int.__repr__,
+                            float:  self._float,
+                            bool:   lambda v: "true" if v else "false",
+                            type(None): lambda v: "null"}
+
+    def encode(self, o:Any) -> str:
+        if isinstance(o, LocationsLibrary) and not self.sort_keys:
+            try:
+                if self.indent is None:
+                    return super(CovidJsonEncoder, self).encode(
+                                                    self._library_to_json(o))
+                if self.item_separator == "," and self.key_separator == ": ":
+                    return self._encode_indented(o)
+            except _NotSupported:
+                pass
+        return super(CovidJsonEncoder, self).encode(o)
+
+    def _float(self, value:float) -> str:
+        if value != value:
+            text = "NaN"
+        elif value in (float("inf"), -float("inf")):
+            text = "Infinity" if value > 0 else "-Infinity"
+        else:
+            return float.__repr__(value)
+        if not self.allow_nan:
+            raise ValueError("Out of range float values are not JSON "\
+                             "compliant: %r" % (value, ))
+        return text
+
+    def _date(self, value:datetime) -> Dict[str, str]:
+        if not isinstance(value, datetime):
+            raise _NotSupported()
+        if value not in self._dates:
+            self._dates[value] = {  "_type": "datetime",
+                                    "_format": self.DATETIME_FORMAT,
+                                    "value": value.strftime(
+                                                self.DATETIME_FORMAT)}
+        return self._dates[value]
+
+    @staticmethod
+    def _fields(library:LocationsLibrary) -> Tuple[List[str], List[Any]]:
+        """ Return library fields and items as lists of entity values.
+
+        Raise _NotSupported when library does not have the usual layout.
+        """
+        if isinstance(library, LocationsTable):
+            columns = [ library.column(f).tolist() for f in ENTITY_FIELDS ]
+            p_10k = ENTITY_FIELDS.index("total_per_10k")
+            p_version = ENTITY_FIELDS.index("VERSION")
+            # Field added in 1.1.0 keeps its integer default
+            columns[p_10k] = [ int(v) if version == "1.0.0" else v
+                               for v, version in zip(columns[p_10k],
+                                                     columns[p_version]) ]
+            return (CovidJsonEncoder.LIBRARY_FIELDS,
+                    [ list(values) for values in zip(*columns) ])
+        fields = list(library.__dict__)
+        if fields != CovidJsonEncoder.LIBRARY_FIELDS:
+            raise _NotSupported()
+        values = []
+        for item in library.items:
+            if type(item) is not LocationEntity or\
+               len(item.__dict__) != len(ENTITY_FIELDS):
+                raise _NotSupported()
+            values.append(list(item.__dict__.values()))
+        return fields, values
+
+    def _library_to_json(self, library:LocationsLibrary) -> Dict[str, Any]:
+        """ Return library as plain dicts and lists """
+        fields, items = self._fields(library)
+        p_date = ENTITY_FIELDS.index("date")
+        p_version = ENTITY_FIELDS.index("VERSION")
+        _items = []
+        for values in items:
+            values[p_date] = self._date(values[p_date])
+            _items.append({ "_type": "LocationEntity",
+                            "_version": values[p_version],
+                            "value": dict(zip(ENTITY_FIELDS, values))})
+        return {"_type": "LocationsLibrary",
+                "_version": library.VERSION,
+                "value": {  "VERSION": library.VERSION,
+                            "date": self._date(library.date),
+                            "items": _items}}
+
+    def _indent(self) -> str:
+        return self.indent if isinstance(self.indent, str)\
+               else " " * self.indent
+
+    def _template(self, keys:List[str], level:int) -> str:
+        """ Return template of indented object with given keys at level """
+        key = (tuple(keys), level)
+        if key not in self._templates:
+            indent = self._indent()
+            inner = "\n" + indent * (level + 1)
+            self._templates[key] = "{" + inner +\
+                ("," + inner).join("%s: %%s" % (self._string(k), )
+                                   for k in keys) +\
+                "\n" + indent * level + "}"
+        return self._templates[key]
+
+    def _value(self, value:Any, level:int) -> str:
+        """ Return indented text of an entity field value """
+        if isinstance(value, datetime):
+            key = (value, level)
+            if key not in self._date_texts:
+                date = self._date(value)
+                self._date_texts[key] = self._template(list(date), level) %\
+                                        tuple(self._string(v) for v in
+                                              date.values())
+            return self._date_texts[key]
+        try:
+            return self._scalars[type(value)](value)
+        except KeyError:
+            raise _NotSupported()
+
+    def _encode_indented(self, library:LocationsLibrary) -> str:
+        fields, items = self._fields(library)
+        wrapper = ["_type", "_version", "value"]
+        item_tmpl = self._template(wrapper, 3)
+        value_tmpl = self._template(ENTITY_FIELDS, 4)
+        p_version = ENTITY_FIELDS.index("VERSION")
+        entity_type = self._string("LocationEntity")
+        _items = []
+        for values in items:
+            _items.append(item_tmpl % ( entity_type,
+                                        self._string(values[p_version]),
+                                        value_tmpl % tuple(self._value(v, 5)
+                                                  for v in values) ))
+        indent = self._indent()
+        if _items:
+            items_text = "[\n" + indent * 3 + (",\n" + indent * 3)\
+                         .join(_items) + "\n" + indent * 2 + "]"
+        else:
+            items_text = "[]"
+        value = self._template(fields, 1) % (self._value(library.VERSION, 2),
+                                             self._value(library.date, 2),
+                                             items_text)
+        return self._template(wrapper, 0) % (self._string("LocationsLibrary"),
+                                             self._string(library.VERSION),
+                                             value)
 
     def default(self, obj:Any) -> str:
-        if isinstance(obj, LocationsLibrary):
+        if isinstance(obj, LocationsTable):
+            return {'_type': 'LocationsLibrary',
+                    '_version': obj.VERSION,
+                    'value': {  "VERSION": obj.VERSION,
+                                "date": obj.date,
+                                "items": list(obj.items)}}
+        elif isinstance(obj, LocationRow):
+            _j = {f: getattr(obj, f) for f in ENTITY_FIELDS}
+            if obj.VERSION == "1.0.0":
+                # Field added in 1.1.0 keeps its integer default
+                _j["total_per_10k"] = int(_j["total_per_10k"])
+            return {'_type': 'LocationEntity',
+                    '_version': obj.VERSION,
+                    'value': _j}
+        elif isinstance(obj, LocationsLibrary):
             _j = {}
             for k, v in obj.__dict__.items():
                 _j[k] = v
@@ -81,3 +377,38 @@ class CovidJsonEncoder(json.JSONEncoder):
                                                         self.TIME_FORMAT)) }
         else:
             raise ValueError("Not supported object type")
+
+
+def dumps_snapshot(library:LocationsLibrary, fmt:str="json") -> bytes:
+    """ Serialize LocationsLibrary into content of a data file """
+    if fmt == "json":
+        return json.dumps(library, cls=CovidJsonEncoder,
+                          indent=2).encode("utf-8")
+    elif fmt == "jsonz":
+        return dumps_columns(library_to_columns(library))
+    raise ValueError("Unknown data file format '%s'" % (fmt, ))
+
+
+def dumps_columns(data:Dict[str, Any]) -> bytes:
+    """ Serialize columnar form of LocationsLibrary in jsonz format """
+    content = {"_type": COLUMNS_TYPE, "_version": COLUMNS_VERSION}
+    content.update(data)
+    buffer = io.BytesIO()
+    # Fixed timestamp, so the same data always gives the same file
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as f:
+        f.write(json.dumps(content, separators=(",", ":")).encode("utf-8"))
+    return buffer.getvalue()
+
+
+def loads_snapshot(content:bytes,
+                   decoder:Optional[CovidFastDecoder]=None) -> Dict[str, Any]:
+    """ Decode content of a data file in any format into columnar form """
+    if content[:2] != GZIP_MAGIC:
+        decoder = decoder or CovidFastDecoder()
+        return decoder.decode(content.decode("utf-8"))
+    data = json.loads(gzip.decompress(content).decode("utf-8"))
+    if not isinstance(data, dict) or data.get("_type") != COLUMNS_TYPE or\
+       data.get("_version") != COLUMNS_VERSION:
+        raise ValueError("Unsupported compressed data file format")
+    return {"VERSION": data["VERSION"], "date": data["date"],
+            "items": data["items"]}
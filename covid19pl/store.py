@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "12th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from datetime import date
+import logging
+import numpy as np
+import os
+from typing import Dict, Optional, Tuple
+
+from cube import HistoryCube
+
+class HistoryStore(object):
+    """ Binary file with normalized history, read through numpy.memmap.
+
+    File has a fixed layout: a header, a table of locations, a table of
+    metrics, a block of dates, a block with mask of present samples and one
+    dates x locations block for every metric. Blocks are allocated for
+    'capacity' days, so appending a day writes only its rows and the header.
+    Readers map blocks directly, loading is cheap and memory pages are
+    shared by all processes using the same workspace. Names, sizes and
+    modification times of data files stored data comes from are kept in
+    a table after the last block, so readers can tell if data is outdated.
+    """
+
+    FILE_NAME = ".history_store.bin"
+    MAGIC = b"C19PLHS"
+    VERSION = 2
+    MIN_CAPACITY = 512
+    HEADER = np.dtype([ ("magic", "S8"), ("version", "<u4"),
+                        ("locations", "<u4"), ("metrics", "<u4"),
+                        ("files", "<u4"), ("capacity", "<u8"),
+                        ("days", "<u8")])
+    LOCATION = np.dtype([("name", "S64")])
+    METRIC = np.dtype([("name", "S56"), ("dtype", "S8")])
+    FILE = np.dtype([("name", "S240"), ("size", "<i8"), ("mtime", "<i8")])
+    # Dates are stored as number of days since 1970-01-01
+    EPOCH = date(1970, 1, 1).toordinal()
+
+    def __init__(self, save_dir:str) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = os.path.join(save_dir, self.FILE_NAME)
+
+    def _blocks(self, locations:int, metrics:Dict[str, str],
+                      capacity:int) -> Dict[str, Tuple[int, np.dtype, tuple]]:
+        """ Return offset, type and shape of every block in the file """
+        blocks = {}
+        offset = self.HEADER.itemsize
+        layout = [  ("locations", self.LOCATION, (locations, )),
+                    ("metrics", self.METRIC, (len(metrics), )),
+                    ("dates", np.dtype("<i8"), (capacity, )),
+                    ("present", np.dtype("u1"), (capacity, locations))]
+        layout += [ (m, np.dtype(t), (capacity, locations))
+                    for m, t in metrics.items() ]
+        for name, dtype, shape in layout:
+            # Keep every block aligned to 8 bytes
+            offset += -offset % 8
+            blocks[name] = (offset, dtype, shape)
+            offset += dtype.itemsize * int(np.prod(shape))
+        blocks["end"] = (offset, np.dtype("u1"), (0, ))
+        return blocks
+
+    def _map(self, blocks:dict, name:str, mode:str,
+                   path:Optional[str]=None) -> np.memmap:
+        offset, dtype, shape = blocks[name]
+        return np.memmap(path or self.path, dtype=dtype, mode=mode,
+                         offset=offset, shape=shape)
+
+    def _read_layout(self) -> Tuple[np.ndarray, dict]:
+        """ Read and validate header, return it with layout of blocks """
+        if not os.path.isfile(self.path):
+            raise FileNotFoundError("History store %s does not exist" %\
+                                    self.path)
+        header = np.fromfile(self.path, dtype=self.HEADER, count=1)
+        if len(header) != 1 or header["magic"][0] != self.MAGIC or\
+           header["version"][0] != self.VERSION:
+            raise ValueError("File %s is not a supported history store" %\
+                             self.path)
+        header = header[0]
+        metrics = np.fromfile(self.path, dtype=self.METRIC,
+                              count=int(header["metrics"]),
+                              offset=self._blocks(int(header["locations"]),
+                                                  {}, 0)["metrics"][0])
+        blocks = self._blocks(int(header["locations"]),
+                              { m["name"].decode(): m["dtype"].decode()
+                                for m in metrics },
+                              int(header["capacity"]))
+        size = blocks["end"][0] + int(header["files"]) * self.FILE.itemsize
+        if os.path.getsize(self.path) < size or\
+           header["days"] > header["capacity"]:
+            raise ValueError("History store %s is truncated" % self.path)
+        return header, blocks
+
+    def open(self) -> HistoryCube:
+        """ Return stored history as a cube backed by memory mapped file.
+
+        Arrays are mapped copy-on-write, so cube can be modified in memory
+        without touching the file.
+        """
+        header, blocks = self._read_layout()
+        days = int(header["days"])
+        locations = [ l.decode("utf-8") for l in
+                      self._map(blocks, "locations", "r")["name"] ]
+        metrics = [ m.decode() for m in
+                    self._map(blocks, "metrics", "r")["name"] ]
+        dates = np.array(self._map(blocks, "dates", "r")[:days])\
+                  .astype("datetime64[D]").astype(object)
+        present = self._map(blocks, "present", "c")[:days].view(bool)
+        data = { m: self._map(blocks, m, "c")[:days] for m in metrics }
+        return HistoryCube(dates, locations, data, present)
+
+    def files(self) -> Dict[str, Tuple[int, int]]:
+        """ Return size and modification time of data files by their names,
+        as they were when stored data was read from them """
+        header, blocks = self._read_layout()
+        table = np.fromfile(self.path, dtype=self.FILE,
+                            count=int(header["files"]),
+                            offset=blocks["end"][0])
+        return { f["name"].decode("utf-8"): (int(f["size"]), int(f["mtime"]))
+                 for f in table }
+
+    def save(self, cube:HistoryCube, files:Dict[str, Tuple[int, int]],
+                   dirty_from:Optional[date]=None) -> None:
+        """ Store the cube with stats of data files it was read from.
+
+        Rows of days already present in the file are kept untouched, unless
+        they are from 'dirty_from' date or later. Only remaining rows, table
+        of files and the header are written. Whole file is rewritten when
+        layout changes, stored dates do not match the cube or capacity is
+        exceeded.
+        """
+        days = len(cube.dates)
+        ordinals = np.array([d.toordinal() - self.EPOCH for d in cube.dates],
+                            dtype=np.int64)
+        metrics = { m: cube[m].dtype.str for m in cube.METRICS }
+        try:
+            header, blocks = self._read_layout()
+            stored = int(header["days"])
+            locations = [ l.decode("utf-8") for l in
+                          self._map(blocks, "locations", "r")["name"] ]
+            stored_metrics = { m["name"].decode(): m["dtype"].decode()
+                               for m in self._map(blocks, "metrics", "r") }
+            if locations != cube.locations or stored_metrics != metrics:
+                raise ValueError("Layout of data changed")
+            if int(header["capacity"]) < days or stored > days or\
+               not np.array_equal(self._map(blocks, "dates", "r")[:stored],
+                                  ordinals[:stored]):
+                raise ValueError("Stored days do not match data")
+        except (OSError, ValueError) as err:
+            self.logger.info("Rewriting history store %s: %s" % (self.path,
+                                                                  err))
+            self._write(cube, ordinals, metrics, files)
+            return
+        start = stored
+        if dirty_from is not None:
+            start = min(start, int(np.searchsorted(ordinals,
+                                    dirty_from.toordinal() - self.EPOCH)))
+        self._write_rows(cube, ordinals, blocks, start, start, files)
+        self.logger.info("Appended %d days to history store %s" %\
+                         (days - start, self.path))
+
+    def append(self, cube:HistoryCube,
+                     files:Dict[str, Tuple[int, int]]) -> None:
+        """ Store days of the cube newer than the last stored day.
+
+        Cube may hold only the most recent days, but it has to include the
+        last stored day, so no day is missed. Stored days are never changed,
+        caller has to make sure their files did not change. ValueError is
+        raised when the cube does not continue stored data.
+        """
+        header, blocks = self._read_layout()
+        stored = int(header["days"])
+        locations = [ l.decode("utf-8") for l in
+                      self._map(blocks, "locations", "r")["name"] ]
+        metrics = { m: cube[m].dtype.str for m in cube.METRICS }
+        stored_metrics = { m["name"].decode(): m["dtype"].decode()
+                           for m in self._map(blocks, "metrics", "r") }
+        if locations != cube.locations or stored_metrics != metrics:
+            raise ValueError("Layout of data changed")
+        ordinals = np.array([d.toordinal() - self.EPOCH for d in cube.dates],
+                            dtype=np.int64)
+        last = self._map(blocks, "dates", "r")[stored-1] if stored else None
+        if last is None or last not in ordinals:
+            raise ValueError("Data does not continue stored days")
+        first = int(np.searchsorted(ordinals, last, side="right"))
+        if stored + len(ordinals) - first > int(header["capacity"]):
+            # Grow the file, stored days are copied from it
+            new = cube.between(cube.dates[first])
+            old = self.open()
+            whole = HistoryCube(np.concatenate([old.dates, new.dates]),
+                                locations,
+                                { m: np.concatenate([old[m], new[m]])
+                                  for m in old.METRICS },
+                                np.concatenate([old.present, new.present]))
+            self._write(whole, np.concatenate([
+                                    self._map(blocks, "dates", "r")[:stored],
+                                    ordinals[first:]]), metrics, files)
+        else:
+            self._write_rows(cube, ordinals, blocks, first, stored, files)
+        self.logger.info("Appended %d days to history store %s" %\
+                         (len(ordinals) - first, self.path))
+
+    def _write(self, cube:HistoryCube, ordinals:np.ndarray,
+                     metrics:Dict[str, str],
+                     files:Dict[str, Tuple[int, int]]) -> None:
+        """ Write whole file from scratch and replace the old one """
+        capacity = self.MIN_CAPACITY
+        while capacity < len(ordinals):
+            capacity *= 2
+        tmp_path = self.path + ".tmp"
+        blocks = self._blocks(len(cube.locations), metrics, capacity)
+        with open(tmp_path, 'wb') as f:
+            f.truncate(blocks["end"][0])
+        header = self._map(self._header_block(), "header", "r+", tmp_path)
+        header["magic"] = self.MAGIC
+        header["version"] = self.VERSION
+        header["locations"] = len(cube.locations)
+        header["metrics"] = len(metrics)
+        header["capacity"] = capacity
+        header.flush()
+        table = self._map(blocks, "locations", "r+", tmp_path)
+        table["name"] = [l.encode("utf-8") for l in cube.locations]
+        table.flush()
+        table = self._map(blocks, "metrics", "r+", tmp_path)
+        table["name"] = [m.encode() for m in metrics]
+        table["dtype"] = [t.encode() for t in metrics.values()]
+        table.flush()
+        self._write_rows(cube, ordinals, blocks, 0, 0, files, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def _header_block(self) -> dict:
+        return {"header": (0, self.HEADER, (1, ))}
+
+    def _write_rows(self, cube:HistoryCube, ordinals:np.ndarray,
+                          blocks:dict, first:int, start:int,
+                          files:Dict[str, Tuple[int, int]],
+                          path:Optional[str]=None) -> None:
+        """ Write rows of the cube from 'first' one onward as stored days
+        from 'start' one, write table of files and commit them in header """
+        days = start + len(ordinals) - first
+        if start < days:
+            block = self._map(blocks, "dates", "r+", path)
+            block[start:days] = ordinals[first:]
+            block.flush()
+            block = self._map(blocks, "present", "r+", path)
+            block[start:days] = cube.present[first:]
+            block.flush()
+            for m in cube.METRICS:
+                block = self._map(blocks, m, "r+", path)
+                block[start:days] = cube[m][first:]
+                block.flush()
+        names = sorted(files)
+        table = np.zeros(len(names), dtype=self.FILE)
+        table["name"] = [n.encode("utf-8") for n in names]
+        table["size"] = [files[n][0] for n in names]
+        table["mtime"] = [files[n][1] for n in names]
+        with open(path or self.path, 'r+b') as f:
+            f.seek(blocks["end"][0])
+            f.write(table.tobytes())
+            f.truncate()
+        # Counters are updated at the end, so readers never see rows
+        # which are not completely written.
+        header = self._map(self._header_block(), "header", "r+", path)
+        header["days"] = days
+        header["files"] = len(names)
+        header.flush()
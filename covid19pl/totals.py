@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "21st December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from datetime import date
+import logging
+import numpy as np
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+from cube import HistoryCube
+
+class RunningTotals(object):
+    """ Running totals of daily values for every location.
+
+    Every metric is a days x locations array of cumulative sums, a row for
+    every day with data, including corrections of gov.pl data. Calendar
+    days are mapped on rows by a lookup array, so total up to any date is
+    a single index operation. Days appended later extend the arrays in
+    place, existing rows are never recomputed. Totals of a date range may
+    start from a baseline, totals up to the day before the range.
+    """
+
+    METRICS = ["total", "dead", "dead_by_covid", "dead_with_covid"]
+    # People missing in gov.pl data, added to running totals from the day
+    CORRECTIONS = [ (date(2020, 11, 22), "POLSKA", "total", -611),
+                    (date(2020, 11, 24), "POLSKA", "total", 22594)]
+    MIN_CAPACITY = 512
+    VERSION = 1
+
+    def __init__(self, locations:List[str]) -> None:
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.locations = list(locations)
+        self._loc_idx = {loc: i for i, loc in enumerate(self.locations)}
+        self._size = 0
+        self._ordinals = np.zeros(self.MIN_CAPACITY, dtype=np.int64)
+        self._data = { m: np.zeros((self.MIN_CAPACITY, len(self.locations)),
+                                   dtype=np.int64) for m in self.METRICS }
+        self._baseline = { m: np.zeros(len(self.locations), dtype=np.int64)
+                           for m in self.METRICS }
+        # Row of the last day with data for every calendar day since first
+        self._rows = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_cube(cls, cube:HistoryCube,
+                       checkpoint:Optional["RunningTotals"]=None)\
+                                                    -> "RunningTotals":
+        """ Compute running totals of daily values held by cube.
+
+        When cube holds only recent days, totals up to the day before its
+        first day are taken from checkpoint, running totals of older days.
+        Checkpoint without days before the cube adds nothing, corrections
+        are then all applied to the cube.
+        """
+        totals = cls(cube.locations)
+        ordinals = np.array([d.toordinal() for d in cube.dates],
+                            dtype=np.int64)
+        daily = { m: cube[m] for m in cls.METRICS }
+        after = None
+        known = checkpoint._ordinals[:checkpoint._size] if checkpoint\
+                else np.zeros(0, dtype=np.int64)
+        row = int(np.searchsorted(known, ordinals[0], side="left")) - 1\
+              if len(ordinals) else -1
+        if row >= 0:
+            # Corrections are included up to the last day checkpoint has
+            # data of, later ones fall on the first day of the cube
+            after = int(known[row])
+            for m in cls.METRICS:
+                values = checkpoint.up_to(date.fromordinal(after), m)
+                totals._baseline[m][:] = [
+                    values[checkpoint._loc_idx[loc]]
+                    if loc in checkpoint._loc_idx else 0
+                    for loc in totals.locations ]
+        totals._extend(ordinals, daily, after)
+        return totals
+
+    def save(self, path:str, files:Dict[str, Tuple[int, int]]) -> None:
+        """ Store totals as a checkpoint in numpy .npz file.
+
+        Names with sizes and modification times of data files totals were
+        computed from are stored as well, see load().
+        """
+        names = sorted(files)
+        arrays = {  "version":      np.array(self.VERSION),
+                    "locations":    np.array(self.locations, dtype=str),
+                    "ordinals":     self._ordinals[:self._size],
+                    "files":        np.array(names, dtype=str),
+                    "stats":        np.array([ files[n] for n in names ],
+                                             dtype=np.int64).reshape(-1, 2)}
+        arrays.update({ m: self[m] for m in self.METRICS })
+        # Write through a file object, np.savez would add .npz extension
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path:str) -> Optional[Tuple["RunningTotals",
+                                              Dict[str, Tuple[int, int]]]]:
+        """ Return totals stored by save() with names and stats of files.
+
+        None is returned when there is no checkpoint or it can't be read.
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if int(stored["version"]) != cls.VERSION:
+                    raise ValueError("Unsupported version")
+                totals = cls([str(l) for l in stored["locations"]])
+                ordinals = stored["ordinals"]
+                data = { m: stored[m] for m in cls.METRICS }
+                files = { str(n): (int(s[0]), int(s[1]))
+                          for n, s in zip(stored["files"], stored["stats"]) }
+        except (OSError, KeyError, ValueError) as err:
+            logging.getLogger(cls.__name__).warning("Unable to read "\
+                                "running totals %s: %s" % (path, err))
+            return None
+        if len(ordinals):
+            totals._ordinals = np.array(ordinals, dtype=np.int64)
+            totals._data = { m: np.array(data[m], dtype=np.int64)
+                             for m in cls.METRICS }
+            totals._size = len(ordinals)
+            days = np.arange(ordinals[0], ordinals[-1] + 1)
+            totals._rows = np.searchsorted(ordinals, days, side="right") - 1
+        return totals, files
+
+    def _corrections(self, ordinals:np.ndarray,
+                           after:Optional[int]=None) -> Dict[str, np.ndarray]:
+        """ Return corrections falling on given days as daily values.
+
+        Correction from a day without data is applied on the next day with
+        data, unless it is already included in totals up to 'after' day.
+        """
+        offsets = { m: np.zeros((len(ordinals), len(self.locations)),
+                                dtype=np.int64) for m in self.METRICS }
+        for day, location, metric, offset in self.CORRECTIONS:
+            row = int(np.searchsorted(ordinals, day.toordinal()))
+            if location not in self._loc_idx or row == len(ordinals) or\
+               (after is not None and day.toordinal() <= after):
+                continue
+            offsets[metric][row, self._loc_idx[location]] += offset
+        return offsets
+
+    def _extend(self, ordinals:np.ndarray,
+                      daily:Dict[str, np.ndarray],
+                      after:Optional[int]=None) -> None:
+        """ Append rows of daily values of consecutive later days.
+
+        First rows start from the baseline, which already includes
+        corrections up to 'after' day.
+        """
+        if not len(ordinals):
+            return
+        last = self._ordinals[self._size - 1] if self._size else after
+        if last is not None and ordinals[0] <= last:
+            raise ValueError("Days must be appended in date order")
+        new_size = self._size + len(ordinals)
+        if new_size > len(self._ordinals):
+            capacity = len(self._ordinals)
+            while capacity < new_size:
+                capacity *= 2
+            self._ordinals = np.resize(self._ordinals, capacity)
+            for m in self.METRICS:
+                grown = np.zeros((capacity, len(self.locations)),
+                                 dtype=np.int64)
+                grown[:self._size] = self._data[m][:self._size]
+                self._data[m] = grown
+        rows = slice(self._size, new_size)
+        self._ordinals[rows] = ordinals
+        corrections = self._corrections(ordinals, last)
+        for m in self.METRICS:
+            block = self._data[m][rows]
+            np.cumsum(np.asarray(daily[m], dtype=np.int64) + corrections[m],
+                      axis=0, out=block)
+            block += self._data[m][self._size - 1] if self._size else\
+                     self._baseline[m]
+        first = self._ordinals[0]
+        days = np.arange(first if not self._size else last + 1,
+                         ordinals[-1] + 1)
+        self._rows = np.concatenate([self._rows,
+                        np.searchsorted(self._ordinals[:new_size], days,
+                                        side="right") - 1])
+        self._size = new_size
+
+    def update(self, cube:HistoryCube) -> None:
+        """ Replace totals from the first day of cube on with days of cube.
+
+        Cube must hold all locations of totals, its daily values of other
+        locations are skipped.
+        """
+        ordinals = np.array([d.toordinal() for d in cube.dates],
+                            dtype=np.int64)
+        if not len(ordinals):
+            return
+        missing = set(self.locations) - set(cube.locations)
+        if missing:
+            raise ValueError("No data of %s" % sorted(missing))
+        keep = int(np.searchsorted(self._ordinals[:self._size], ordinals[0]))
+        if keep:
+            self._rows = self._rows[:self._ordinals[keep - 1] -\
+                                    self._ordinals[0] + 1]
+        else:
+            self._rows = np.zeros(0, dtype=np.int64)
+        self._size = keep
+        columns = [ cube.index_of(loc) for loc in self.locations ]
+        self._extend(ordinals, { m: cube[m][:, columns]
+                                 for m in self.METRICS })
+
+    def append(self, day:date, daily:Dict[str, np.ndarray]) -> None:
+        """ Add daily values of all locations from a day after the last one """
+        self._extend(np.array([day.toordinal()], dtype=np.int64),
+                     { m: np.asarray(daily[m]).reshape(1, -1)
+                       for m in self.METRICS })
+
+    def __getitem__(self, metric:str) -> np.ndarray:
+        """ Return days x locations array of running totals of a metric """
+        return self._data[metric][:self._size]
+
+    @property
+    def dates(self) -> List[date]:
+        return [date.fromordinal(int(o)) for o in self._ordinals[:self._size]]
+
+    def up_to(self, day:date, metric:str,
+                    location:Optional[str]=None) -> Union[int, np.ndarray]:
+        """ Return total of a metric up to the day, including the day.
+
+        Totals of all locations are returned unless location is given.
+        """
+        offset = day.toordinal() - (self._ordinals[0] if self._size else 0)
+        if not self._size or offset < 0:
+            values = self._baseline[metric]
+        else:
+            row = self._rows[min(offset, len(self._rows) - 1)]
+            values = self._data[metric][row]
+        if location is None:
+            return values
+        return int(values[self._loc_idx[location]])
+
+    def latest(self, metric:str) -> np.ndarray:
+        """ Return current totals of a metric for every location """
+        if not self._size:
+            return self._baseline[metric]
+        return self._data[metric][self._size - 1]
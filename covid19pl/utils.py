@@ -9,19 +9,20 @@ __maintainer__  = "oscarsierraproject.eu"
 __email__       = "oscarsierraproject@protonmail.com"
 __status__      = "Development"
 
-from dotenv import load_dotenv
-import email.message
-from email.mime.text import MIMEText
 import logging
 import logging.config
 import os
-import pandas as pd
-import smtplib
-from typing import Dict
+from typing import TYPE_CHECKING
+
+# Modules used only by some of the options are imported where they are
+# needed, so startup of other runs doesn't pay for them.
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Load environment variables ---------------------------------------------------
 def load_env_variables(env_file_path):
     if os.path.isfile(env_file_path):
+        from dotenv import load_dotenv
         load_dotenv( dotenv_path = env_file_path)
     else:
         raise FileNotFoundError("Environment file '%s' does not exist!" %\
@@ -55,35 +56,53 @@ def setup_root_logger():
 # ------------------------------------------------------------------------------
 
 
-def display_todays_stats_for_all_locations (
-        gathered_data:Dict[str, pd.DataFrame]) -> None:
-    """ Display actual summary data and 1 day change. """
-    print(  "%-20s: %7s %7s %8s %7s %7s" % \
-            ("Location", "Total", "Death", "CHANGE:", "Total", "Death"))
-    for loc, data in gathered_data.items():
-        infected_total = data["total"].sum()
-        infected_today = data["total"].iat[-1]
-        dead_total = data["dead"].sum()
-        dead_today = data["dead"].iat[-1]
-        print(  "%-20s: %7s %7s %8s %7s %7s" % \
-                (loc, infected_total, dead_total,
-                 "", infected_today, dead_today))
-
-
-def get_todays_stats_for_location_as_str(
-        location:str, data:pd.DataFrame) -> str:
-    """ Convert current summary data into string """
-    date = str(data["date"].iat[-1])
-    infected_total = data["total"].sum()
-    infected_today = data["total"].iat[-1]
-    dead_total = data["dead"].sum()
-    dead_today = data["dead"].iat[-1]
+def _format_indicator(value:float, fmt:str) -> str:
+    """ Return indicator formatted, '-' if it is not known """
+    if value != value:
+        return "-"
+    return fmt % value
+
+
+def display_todays_stats_for_all_locations (summary:"pd.DataFrame") -> None:
+    """ Display actual summary data, 1 day change and indicators.
+
+    Summary holds a row for every location, see
+    Covid19HistoryContainer.get_summary().
+    """
+    print(  "%-20s: %7s %7s %8s %7s %7s %12s %8s %8s" % \
+            ("Location", "Total", "Death", "CHANGE:", "Total", "Death",
+             "SMA7 / 100k", "WEEK", "DOUBLING"))
+    for loc, row in summary.iterrows():
+        print(  "%-20s: %7s %7s %8s %7s %7s %12s %8s %8s" % \
+                (loc, row["total"], row["dead"],
+                 "", row["total_today"], row["dead_today"],
+                 _format_indicator(row["NC_per_100k_SMA_7"], "%.2f"),
+                 _format_indicator(row["NC_growth_WoW"], "%+.1f%%"),
+                 _format_indicator(row["doubling_time"], "%.0f d")))
+
+
+def get_todays_stats_for_location_as_str(location:str,
+                                         row:"pd.Series") -> str:
+    """ Convert current summary data of a location into string """
+    date = str(row["date"])
+    infected_total = row["total"]
+    infected_today = row["total_today"]
+    dead_today = row["dead_today"]
+    sma_per_100k = _format_indicator(row["NC_per_100k_SMA_7"], "%.2f")
+    growth = _format_indicator(row["NC_growth_WoW"], "%+.1f%%")
+    doubling = _format_indicator(row["doubling_time"], "%.0f days")
     return f"{location} on {date} has {infected_total} infections in total"\
-           f"with {infected_today} new infections and {dead_today} new deaths."
+           f"with {infected_today} new infections and {dead_today} new deaths."\
+           f" Last 7 days: {sma_per_100k} new infections per 100k citizens"\
+           f" a day, {growth} week over week, cases double in {doubling}."
 
 
-def send_summary_email(recipient, data):
-    """ Send email with summary data """
+def send_summary_email(recipient, summary):
+    """ Send email with summary data, see
+    display_todays_stats_for_all_locations() """
+    import email.message
+    import smtplib
+    logger = logging.getLogger(__name__)
     SRV_ADDR    = os.getenv("EMAIL_SMTP_SRV_ADDR")
     SRV_PORT    = os.getenv("EMAIL_SMTP_SRV_PORT")
     SRV_LOGIN   = os.getenv("EMAIL_SMTP_SRV_LOGIN")
@@ -91,11 +110,11 @@ def send_summary_email(recipient, data):
 
     if None in [SRV_ADDR, SRV_PORT, SRV_LOGIN, SRV_PWD]:
         msg = "Unable to send email, no SMTP server configuration provided"
-        self.logger.error(msg)
+        logger.error(msg)
         return
     TEXT = ["Summary of COVID19 cases in Poland.", ""]
-    for loc, data in data.items():
-        TEXT.append(get_todays_stats_for_location_as_str(loc, data))
+    for loc, row in summary.iterrows():
+        TEXT.append(get_todays_stats_for_location_as_str(loc, row))
     payload = "\n".join(TEXT)
 
     # Prepare actual message
@@ -112,9 +131,9 @@ def send_summary_email(recipient, data):
         server.login( SRV_LOGIN, SRV_PWD )
         server.send_message(msg)
         server.close()
-        self.logger.info('Successfully sent mail to %s' % msg["To"])
+        logger.info('Successfully sent mail to %s' % msg["To"])
     except Exception as err:
         print(err)
-        self.logger.error("Failed to send mail to %s" % msg["To"])
+        logger.error("Failed to send mail to %s" % msg["To"])
         raise err
 
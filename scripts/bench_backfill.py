@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of backfilling missing days from archived gov.pl like pages,
+    served by a local HTTP stand-in with latency and transient failures.
+    Fetching one page at a time is compared with concurrent fetching."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "17th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+from datetime import date, timedelta
+import logging
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "covid19pl"))
+from crawler import Covid19DataCrawler
+from fetch import AsyncFetchEngine
+from http_standin import HttpStandIn
+from bench_crawler import make_page
+
+FIRST_DAY = date(2020, 11, 24)
+
+
+def read_dir(path:str) -> dict:
+    contents = {}
+    for f in sorted(os.listdir(path)):
+        with open(os.path.join(path, f), 'rb') as fd:
+            contents[f] = fd.read()
+    return contents
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--days=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--days", action="store", type="int", dest="days",
+                        default=30, help="days in range [default: %default]")
+    parser.add_option(  "--size", action="store", type="int", dest="size",
+                        default=150, help="page size in kB [default: %default]")
+    parser.add_option(  "--latency", action="store", type="float",
+                        dest="latency", default=0.05,
+                        help="server latency in seconds [default: %default]")
+    parser.add_option(  "--concurrency", action="store", type="int",
+                        dest="concurrency", default=8,
+                        help="requests in flight [default: %default]")
+    parser.add_option(  "--rate", action="store", type="float", dest="rate",
+                        default=50.0,
+                        help="requests per second [default: %default]")
+    (options, args) = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    days = [FIRST_DAY + timedelta(days=i) for i in range(options.days)]
+    print("%-12s %10s %6s %9s %12s %8s %6s" % ("MODE", "TIME [s]", "SAVED",
+                                               "REQUESTS", "CONNECTIONS",
+                                               "RETRIES", "FILES"))
+    results = []
+    for concurrency in [1, options.concurrency]:
+        with HttpStandIn(options.latency) as server,\
+             tempfile.TemporaryDirectory() as tmp:
+            for i, day in enumerate(days):
+                if i % 7 == 3:
+                    # Day already in workspace
+                    open(os.path.join(tmp, "COVID19_PL_%s.json" % day),
+                         'w').close()
+                    continue
+                if i % 11 == 5:
+                    # Day missing in archive
+                    continue
+                server.add("/archive/%s" % day,
+                           make_page(options.size * 1024, 380 + i),
+                           {"Content-Type": "text/html; charset=utf-8"},
+                           failures=1 if i % 5 == 0 else 0)
+            engine = AsyncFetchEngine(concurrency, options.rate,
+                                      backoff=0.05)
+            crawler = Covid19DataCrawler(
+                            archive_url=server.url("/archive/{date}"),
+                            engine=engine)
+            start = time.perf_counter()
+            saved = crawler.backfill(days[0], days[-1], tmp)
+            elapsed = time.perf_counter() - start
+            results.append(read_dir(tmp))
+            print("%-12s %10.2f %6d %9d %12d %8d %6d" % (
+                        "%d in flight" % concurrency, elapsed, len(saved),
+                        len(server.requests), len(server.connections),
+                        engine.retried, len(results[-1])))
+    print("Identical snapshots: %s" % (results[0] == results[-1], ))
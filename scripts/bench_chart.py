@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of reused summary charts. Plot of Poland and of every province
+    is rendered from bundled data with a chart built for every plot and with
+    a single chart updated with data of every plot. Time of the first render
+    of the single chart, including its layout, and mean times of subsequent
+    renders of both ways are reported."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "27th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import datetime
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from history import Covid19HistoryContainer
+from indicators import PLOT_INDICATORS, lookback
+from plot import SummaryChart, plot_file_name
+
+
+def render(chart:SummaryChart, loc:str, df, province:dict,
+           workspace:str) -> float:
+    """ Render plot of a location with given chart, return time in seconds """
+    start = time.perf_counter()
+    chart.update(loc, df, province)
+    chart.save(os.path.join(workspace, plot_file_name(loc)))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--from_date=YYYY-MM-DD] "\
+                                            "[--rounds=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--from_date", action="store", dest="from_date",
+                        default="2020-12-01",
+                        help="first plotted day [default: %default]")
+    parser.add_option(  "--rounds", action="store", type="int", dest="rounds",
+                        default=2,
+                        help="number of times every plot is rendered "\
+                             "[default: %default]")
+    (options, args) = parser.parse_args()
+
+    from_date = datetime.datetime.strptime(options.from_date,
+                                           "%Y-%m-%d").date()
+    history = Covid19HistoryContainer()
+    history.load_data_from_files(os.path.join(BASE_DIR, "covid19pl", "data"),
+                                 use_cache=False,
+                                 date_from=from_date - datetime.timedelta(
+                                            days=lookback(PLOT_INDICATORS)))
+    data = { loc: values[values["date"] >= from_date].reset_index(drop=True)
+             for loc, values in
+             history.get_data_to_analyse(PLOT_INDICATORS).items() }
+    province = {"index": [], "values": []}
+    for loc, dataframe in data.items():
+        if loc != "POLSKA":
+            province["index"].append(loc)
+            province["values"].append(dataframe.iloc[-1]["total"])
+
+    print("%-8s %6s %12s %12s %12s %10s" % ("MODE", "PLOTS", "FIRST [s]",
+                                            "NEXT [s]", "FRESH [s]",
+                                            "SPEEDUP"))
+    for compact in [False, True]:
+        with tempfile.TemporaryDirectory() as workspace:
+            # Chart built for every plot, as before charts were reused
+            fresh = []
+            for _ in range(options.rounds):
+                for loc, df in data.items():
+                    start = time.perf_counter()
+                    chart = SummaryChart(compact)
+                    fresh.append(render(chart, loc, df, province, workspace) +\
+                                 time.perf_counter() - start)
+            # Single chart, its layout is built before the first render only
+            reused = []
+            for _ in range(options.rounds):
+                for loc, df in data.items():
+                    start = time.perf_counter()
+                    if not reused:
+                        chart = SummaryChart(compact)
+                    reused.append(time.perf_counter() - start +\
+                                  render(chart, loc, df, province, workspace))
+        # The first fresh chart warms up fonts and caches, it is skipped
+        mean_fresh = sum(fresh[1:]) / len(fresh[1:])
+        mean_next = sum(reused[1:]) / len(reused[1:])
+        print("%-8s %6d %12.3f %12.3f %12.3f %9.2fx" % (
+                    "compact" if compact else "daily", len(reused),
+                    reused[0], mean_next, mean_fresh, mean_fresh / mean_next))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of extracting 'registerData' from gov.pl like pages of
+    different sizes, served by a local HTTP stand-in. Streaming extractor is
+    compared with parsing whole page with BeautifulSoup."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "15th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+from bs4 import BeautifulSoup
+import html
+import json
+import optparse
+import os
+import sys
+import time
+import urllib.request
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "covid19pl"))
+from crawler import Covid19DataCrawler
+from http_standin import HttpStandIn
+
+PROVINCES = [   "dolnośląskie", "kujawsko-pomorskie", "lubelskie", "lubuskie",
+                "łódzkie", "małopolskie", "mazowieckie", "opolskie",
+                "podkarpackie", "podlaskie", "pomorskie", "śląskie",
+                "świętokrzyskie", "warmińsko-mazurskie", "wielkopolskie",
+                "zachodniopomorskie"]
+
+
+def parsed_data(rows:int) -> list:
+    """ Return records in format published on gov.pl since 24.11.2020 """
+    data = [{   "Województwo": "Cały kraj", "Powiat/Miasto": "Cały kraj",
+                "Liczba": "%d" % (rows * 40, ),
+                "Liczba na 10 tys. mieszkańców": "1,23",
+                "Wszystkie przypadki śmiertelne": "400",
+                "Przypadki śmiertelne w wyniku Covid": "100",
+                "Przypadki śmiertelne w wyniku chorób współistniejących": "300",
+                "Liczba zlecanych testów przez POZ": "1 234",
+                "Liczba osób objętych kwarantanną": "100 000",
+                "Teryt": "t00"}]
+    for i in range(rows):
+        data.append({
+                "Województwo": PROVINCES[i % len(PROVINCES)],
+                "Powiat/Miasto": "powiat %d" % (i, ),
+                "Liczba": "%d" % (1000 + i, ),
+                "Liczba na 10 tys. mieszkańców": "%d,%02d" % (i % 9, i % 100),
+                "Wszystkie przypadki śmiertelne": "%d" % (i % 50, ),
+                "Przypadki śmiertelne w wyniku Covid": "%d" % (i % 20, ),
+                "Przypadki śmiertelne w wyniku chorób współistniejących":
+                    "%d" % (i % 30, ),
+                "Liczba zlecanych testów przez POZ": "%d" % (i * 3, ),
+                "Liczba osób objętych kwarantanną": "1 %03d" % (i % 1000, ),
+                "Teryt": "t%04d" % (i, )})
+    return data
+
+
+def make_page(size:int, rows:int) -> bytes:
+    """ Return HTML page of roughly given size, with 'registerData' element
+    placed after first third of the page, like on gov.pl """
+    register = json.dumps({ "description": "Wykaz zarażeń koronawirusem",
+                            "fileName": "wykaz.csv",
+                            "parsedData": json.dumps(parsed_data(rows))})
+    filler = '<div class="article-area"><p>Lorem ipsum <a href="/web/'\
+             'koronawirus/%d">dolor</a> sit amet.</p><ul><li>one</li>'\
+             '<li>two</li></ul></div>\n'
+    head = "<!DOCTYPE html><html lang=\"pl\"><head><title>gov.pl</title>"\
+           "</head><body>\n"
+    body = []
+    while len(head) + sum(len(b) for b in body) < size // 3:
+        body.append(filler % len(body))
+    body.append('<pre id="registerData" class="hide">%s</pre>\n' %\
+                html.escape(register, quote=False))
+    while len(head) + sum(len(b) for b in body) < size:
+        body.append(filler % len(body))
+    return (head + "".join(body) + "</body></html>").encode("utf-8")
+
+
+def with_beautifulsoup(url:str) -> dict:
+    web_url = urllib.request.urlopen(url)
+    bs = BeautifulSoup(web_url.read(), 'html.parser')
+    return json.loads(bs.find(id="registerData").text.replace("'", "\""))
+
+
+def with_streaming(url:str) -> dict:
+    web_url = urllib.request.urlopen(url)
+    return Covid19DataCrawler(url).read_register_data(web_url)
+
+
+def bench(func, url:str, repeat:int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(url)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--sizes=KB,KB,...]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--sizes", action="store", dest="sizes",
+                        default="150,500,2000",
+                        help="comma separated page sizes in kB "\
+                             "[default: %default]")
+    parser.add_option(  "--rows", action="store", type="int", dest="rows",
+                        default=380,
+                        help="records in registerData [default: %default]")
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=5, help="number of repetitions [default: %default]")
+    parser.add_option(  "--save", action="store", dest="save",
+                        help="directory to save generated HTML fixtures")
+    (options, args) = parser.parse_args()
+
+    print("%10s %16s %16s %8s %10s" % ("PAGE [kB]", "BS4 [ms]",
+                                       "STREAMING [ms]", "SPEEDUP",
+                                       "IDENTICAL"))
+    with HttpStandIn() as server:
+        for size in [int(s) * 1024 for s in options.sizes.split(",")]:
+            page = make_page(size, options.rows)
+            path = "/page_%d.html" % (size // 1024, )
+            if options.save:
+                with open(os.path.join(options.save, path[1:]), 'wb') as f:
+                    f.write(page)
+            server.add(path, page,
+                       {"Content-Type": "text/html; charset=utf-8"})
+            bs_time, bs_data = bench(with_beautifulsoup, server.url(path),
+                                     options.repeat)
+            st_time, st_data = bench(with_streaming, server.url(path),
+                                     options.repeat)
+            print("%10d %16.2f %16.2f %8.2f %10s" % (len(page) // 1024,
+                                                     bs_time * 1e3,
+                                                     st_time * 1e3,
+                                                     bs_time / st_time,
+                                                     bs_data == st_data))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Microbenchmark comparing hook based CovidJsonDecoder with schema aware
+    CovidFastDecoder on bundled data files."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "8th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import optparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from serializers import CovidFastDecoder, CovidJsonDecoder, library_to_columns
+
+
+def hook_decoder(documents:list) -> list:
+    decoder = CovidJsonDecoder()
+    return [library_to_columns(decoder.decode(d)) for d in documents]
+
+
+def fast_decoder(documents:list) -> list:
+    decoder = CovidFastDecoder()
+    return [decoder.decode(d) for d in documents]
+
+
+def bench(func, documents:list, repeat:int) -> tuple:
+    """ Return best time of decoding all documents and the result """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(documents)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--repeat=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=5, help="number of repetitions [default: %default]")
+    parser.add_option(  "--workspace", action="store", dest="workspace",
+                        default=os.path.join(BASE_DIR, "covid19pl", "data"),
+                        help="path to directory with data [default: %default]")
+    (options, args) = parser.parse_args()
+
+    documents = []
+    for f in sorted(os.listdir(options.workspace)):
+        if "COVID19" in f:
+            with open(os.path.join(options.workspace, f), 'r') as f_json:
+                documents.append(f_json.read())
+
+    hook_time, hook_result = bench(hook_decoder, documents, options.repeat)
+    fast_time, fast_result = bench(fast_decoder, documents, options.repeat)
+    print("Decoded %d files" % (len(documents), ))
+    print("%-20s: %8.4f s" % ("CovidJsonDecoder", hook_time))
+    print("%-20s: %8.4f s" % ("CovidFastDecoder", fast_time))
+    print("%-20s: %8.2f x" % ("Speedup", hook_time / fast_time))
+    print("%-20s: %8s" % ("Identical", hook_result == fast_result))
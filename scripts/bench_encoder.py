@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of CovidJsonEncoder. All bundled data files are re-encoded,
+    as LocationsLibrary and as LocationsTable, with the single pass fast
+    path and with per-object default() calls."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "20th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import json
+import optparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from serializers import CovidFastDecoder, CovidJsonDecoder, CovidJsonEncoder,\
+                        columns_to_table
+
+
+class DefaultOnlyEncoder(CovidJsonEncoder):
+    """ Encoder using only default(), as before the fast path """
+
+    def encode(self, o):
+        return json.JSONEncoder.encode(self, o)
+
+
+def encode_all(libraries:list, encoder:type, indent) -> tuple:
+    start = time.perf_counter()
+    texts = [json.dumps(l, cls=encoder, indent=indent) for l in libraries]
+    return time.perf_counter() - start, texts
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--repeat=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=3, help="number of repetitions [default: %default]")
+    (options, args) = parser.parse_args()
+
+    data_dir = os.path.join(BASE_DIR, "covid19pl", "data")
+    contents = []
+    for f in sorted(os.listdir(data_dir)):
+        if "COVID19" in f:
+            with open(os.path.join(data_dir, f), 'r') as fd:
+                contents.append(fd.read())
+    inputs = {  "library":  [CovidJsonDecoder().decode(c) for c in contents],
+                "table":    [columns_to_table(CovidFastDecoder().decode(c))
+                             for c in contents]}
+
+    print("%-8s %-7s %14s %14s %8s %10s" % ("INPUT", "INDENT", "DEFAULT [s]",
+                                            "FAST [s]", "SPEEDUP",
+                                            "IDENTICAL"))
+    for name, libraries in inputs.items():
+        for indent in [2, None]:
+            slow = min(encode_all(libraries, DefaultOnlyEncoder, indent)
+                       for _ in range(options.repeat))
+            fast = min(encode_all(libraries, CovidJsonEncoder, indent)
+                       for _ in range(options.repeat))
+            print("%-8s %-7s %14.3f %14.3f %8.2f %10s" % (name, indent,
+                                                          slow[0], fast[0],
+                                                          slow[0] / fast[0],
+                                                          slow[1] == fast[1]))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of memory used by history kept as LocationsLibrary objects
+    with LocationEntity items and as array backed LocationsTable objects."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "14th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+from datetime import datetime, timedelta
+import gc
+import optparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "covid19pl"))
+from entities import LocationEntity, LocationsLibrary, LocationsTable
+
+FIRST_DAY = datetime(2020, 11, 24, 10, 30)
+
+
+def location_names(locations:int) -> list:
+    # Names are built for every day, as they would be by JSON decoder
+    return ["powiat %04d" % i for i in range(locations)]
+
+
+def entity_history(days:int, locations:int) -> list:
+    history = []
+    for day in range(days):
+        date = FIRST_DAY + timedelta(days=day)
+        items = [ LocationEntity(   province=name,
+                                    total=day + i,
+                                    total_per_10k=(day + i) / 100.0,
+                                    dead=i,
+                                    dead_by_covid=i,
+                                    date=date.replace(),
+                                    VERSION="1.1.0")
+                  for i, name in enumerate(location_names(locations)) ]
+        history.append(LocationsLibrary(VERSION="1.0.0", date=date,
+                                        items=items))
+    return history
+
+
+def table_history(days:int, locations:int) -> list:
+    history = []
+    for day in range(days):
+        date = FIRST_DAY + timedelta(days=day)
+        columns = { "province":         location_names(locations),
+                    "total":            [day + i for i in range(locations)],
+                    "total_per_10k":    [(day + i) / 100.0
+                                         for i in range(locations)],
+                    "dead":             list(range(locations)),
+                    "recovered":        [0] * locations,
+                    "dead_by_covid":    list(range(locations)),
+                    "dead_with_covid":  [0] * locations,
+                    "date":             [date] * locations,
+                    "VERSION":          ["1.1.0"] * locations}
+        history.append(LocationsTable.from_columns("1.0.0", date, columns))
+    return history
+
+
+def measure(func, days:int, locations:int) -> tuple:
+    """ Return memory held by created history and time of creating it """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    history = func(days, locations)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del history
+    return current, elapsed
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--days=N --locations=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--days", action="store", type="int", dest="days",
+                        default=10000, help="number of days [default: %default]")
+    parser.add_option(  "--locations", action="store", type="int",
+                        dest="locations", default=400,
+                        help="number of locations [default: %default]")
+    (options, args) = parser.parse_args()
+
+    rows = options.days * options.locations
+    print("History of %d days x %d locations" % (options.days,
+                                                 options.locations))
+    print("%-16s %12s %14s %10s" % ("STORAGE", "MEMORY [MB]",
+                                    "PER ITEM [B]", "TIME [s]"))
+    results = {}
+    for name, func in [ ("LocationsLibrary", entity_history),
+                        ("LocationsTable", table_history) ]:
+        memory, elapsed = measure(func, options.days, options.locations)
+        results[name] = memory
+        print("%-16s %12.1f %14.1f %10.2f" % (name, memory / 2**20,
+                                              memory / rows, elapsed))
+    print("Reduction: %.1f x" % (results["LocationsLibrary"] /
+                                 results["LocationsTable"]))
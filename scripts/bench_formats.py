@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of data file formats. Bundled data files are converted into
+    every format, bytes on disk and time of decoding files and of loading
+    whole history without caches are reported."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "19th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from history import Covid19HistoryContainer
+from ingest import decode_files
+from serializers import SNAPSHOT_FORMATS, CovidFastDecoder
+from convert_workspace import convert, file_format
+
+
+def best_of(func, repeat:int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--repeat=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=3, help="number of repetitions [default: %default]")
+    (options, args) = parser.parse_args()
+
+    data_dir = os.path.join(BASE_DIR, "covid19pl", "data")
+    print("%-6s %6s %12s %12s %12s %10s" % ("FORMAT", "FILES", "BYTES",
+                                             "DECODE [s]", "LOAD [s]",
+                                             "IDENTICAL"))
+    reference = None
+    for fmt in SNAPSHOT_FORMATS:
+        with tempfile.TemporaryDirectory() as workspace:
+            paths = []
+            for f in sorted(os.listdir(data_dir)):
+                if "COVID19" not in f:
+                    continue
+                path = os.path.join(workspace, f)
+                shutil.copyfile(os.path.join(data_dir, f), path)
+                if file_format(f) != fmt:
+                    path = convert(path, fmt, CovidFastDecoder())
+                paths.append(path)
+            size = sum(os.path.getsize(p) for p in paths)
+            decode_time = best_of(lambda: decode_files(paths), options.repeat)
+            histories = []
+            def load():
+                histories.append(Covid19HistoryContainer())
+                histories[-1].load_data_from_files(workspace, use_cache=False)
+            load_time = best_of(load, options.repeat)
+            data = histories[-1].get_data_to_analyse()
+            if reference is None:
+                reference = data
+            identical = list(data) == list(reference) and\
+                        all(data[k].equals(reference[k]) for k in reference)
+            print("%-6s %6d %12d %12.3f %12.3f %10s" % (fmt, len(paths), size,
+                                                        decode_time, load_time,
+                                                        identical))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of filling history container with synthetic daily samples
+    and building per-province DataFrames from it."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "5th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+from datetime import datetime, timedelta
+import optparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "covid19pl"))
+from entities import LocationsTable
+from history import Covid19HistoryContainer
+
+PROVINCES = [   "Cała Polska", "dolnośląskie", "kujawsko-pomorskie",
+                "lubelskie", "lubuskie", "łódzkie", "małopolskie",
+                "mazowieckie", "opolskie", "podkarpackie", "podlaskie",
+                "pomorskie", "śląskie", "świętokrzyskie",
+                "warmińsko-mazurskie", "wielkopolskie", "zachodniopomorskie"]
+FIRST_DAY   = datetime(2020, 3, 3, 23, 55)
+CUTOVER_DAY = datetime(2020, 11, 24)
+
+
+def synthetic_history(days:int) -> list:
+    """ Prepare list of daily samples in both 1.0.0 and 1.1.0 format """
+    history = []
+    for day in range(days):
+        date = FIRST_DAY + timedelta(days=day)
+        version = "1.0.0" if date < CUTOVER_DAY else "1.1.0"
+        size = len(PROVINCES)
+        columns = { "province":         PROVINCES,
+                    "total":            [day * (i + 1) for i in range(size)],
+                    "total_per_10k":    [day / 10.0] * size,
+                    "dead":             [day // 10] * size,
+                    "recovered":        [0] * size,
+                    "dead_by_covid":    [0] * size,
+                    "dead_with_covid":  [0] * size,
+                    "date":             [date] * size,
+                    "VERSION":          [version] * size}
+        history.append(LocationsTable.from_columns("1.0.0", date, columns))
+    return history
+
+
+def bench(days:int, repeat:int) -> tuple:
+    """ Return best times of adding samples to history and building
+    DataFrames for given number of days """
+    history = synthetic_history(days)
+    best_add, best_build = float("inf"), float("inf")
+    for _ in range(repeat):
+        container = Covid19HistoryContainer()
+        start = time.perf_counter()
+        container.add_many(history)
+        best_add = min(best_add, time.perf_counter() - start)
+        start = time.perf_counter()
+        container._move_data_dataframe()
+        best_build = min(best_build, time.perf_counter() - start)
+    return best_add, best_build
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--days=N,N,...]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--days", action="store", dest="days",
+                        default="500,1000,2500,5000,10000",
+                        help="comma separated history lengths [default: %default]")
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=3, help="number of repetitions [default: %default]")
+    (options, args) = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    print("%8s %10s %10s %14s" % ("DAYS", "ADD [s]", "BUILD [s]",
+                                  "PER DAY [us]"))
+    for days in [int(d) for d in options.days.split(",")]:
+        add, build = bench(days, options.repeat)
+        print("%8d %10.4f %10.4f %14.2f" % (days, add, build,
+                                            (add + build) / days * 1e6))
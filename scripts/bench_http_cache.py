@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of polling gov.pl like page, served by a local HTTP stand-in,
+    with and without response cache. With cache in use requests are
+    conditional, unchanged page is answered with 304 and nothing is parsed
+    nor saved. Headers of every request are reported."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "16th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import logging
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "covid19pl"))
+from crawler import Covid19DataCrawler
+from http_standin import HttpStandIn
+from bench_crawler import make_page
+
+LAST_MODIFIED = "Tue, 15 Dec 2020 10:%02d:00 GMT"
+
+
+def poll(server:HttpStandIn, url:str, save_dir:str, cache:bool) -> tuple:
+    """ Poll page once, return time, conditional headers and saved files """
+    before = set(os.listdir(save_dir))
+    requests = len(server.requests)
+    crawler = Covid19DataCrawler(url, cache_dir=save_dir if cache else None)
+    start = time.perf_counter()
+    crawler.save_data_in_file(save_dir)
+    elapsed = time.perf_counter() - start
+    headers = server.requests[requests][1]
+    conditional = ", ".join("%s: %s" % (k, v) for k, v in headers.items()
+                            if k.startswith("If-"))
+    saved = [ f for f in set(os.listdir(save_dir)) - before
+              if f.startswith("COVID19") ]
+    return elapsed, conditional or "-", saved
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--polls=N]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--size", action="store", type="int", dest="size",
+                        default=500, help="page size in kB [default: %default]")
+    parser.add_option(  "--rows", action="store", type="int", dest="rows",
+                        default=380,
+                        help="records in registerData [default: %default]")
+    parser.add_option(  "--polls", action="store", type="int", dest="polls",
+                        default=5,
+                        help="polls of unchanged page [default: %default]")
+    (options, args) = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    path = "/web/koronawirus/wykaz-zarazen-koronawirusem-sars-cov-2"
+    print("%-8s %-6s %4s %12s %8s  %s" % ("MODE", "PAGE", "POLL", "TIME [ms]",
+                                          "SAVED", "CONDITIONAL HEADERS"))
+    for cache in [False, True]:
+        mode = "cache" if cache else "no cache"
+        with HttpStandIn() as server, tempfile.TemporaryDirectory() as tmp:
+            pages = [("v1", make_page(options.size * 1024, options.rows))]
+            pages += [("v1", pages[0][1])] * options.polls
+            # Page regenerated with new validators, but same data
+            pages += [("v1'", pages[0][1])]
+            pages += [("v2", make_page(options.size * 1024,
+                                       options.rows + 1))]
+            for i, (version, page) in enumerate(pages):
+                generation = len(set(p[0] for p in pages[:i+1]))
+                server.add(path, page,
+                           {"Content-Type": "text/html; charset=utf-8",
+                            "ETag": '"%s-%d"' % (version, generation),
+                            "Last-Modified": LAST_MODIFIED % generation})
+                elapsed, conditional, saved = poll(server, server.url(path),
+                                                   tmp, cache)
+                # File names have one second resolution, keep them unique
+                for f in saved:
+                    os.rename(os.path.join(tmp, f),
+                              os.path.join(tmp, "%02d_%s" % (i, f)))
+                print("%-8s %-6s %4d %12.2f %8d  %s" % (mode, version, i,
+                                                        elapsed * 1e3,
+                                                        len(saved),
+                                                        conditional))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of decoding data files with a different number of processes.
+    Bundled data files are copied into temporary workspace as many times as
+    requested to simulate long history."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "7th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import optparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from ingest import decode_files
+
+
+def prepare_workspace(workspace:str, copies:int) -> list:
+    """ Fill workspace with copies of bundled data files """
+    data_dir = os.path.join(BASE_DIR, "covid19pl", "data")
+    paths = []
+    for f in sorted(os.listdir(data_dir)):
+        if "COVID19" not in f:
+            continue
+        for copy in range(copies):
+            path = os.path.join(workspace, "%s_%04d.json" % (f[:-5], copy))
+            shutil.copyfile(os.path.join(data_dir, f), path)
+            paths.append(path)
+    return sorted(paths)
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--jobs=N,N,...]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--copies", action="store", type="int", dest="copies",
+                        default=10,
+                        help="copies of every data file [default: %default]")
+    parser.add_option(  "--jobs", action="store", dest="jobs",
+                        default="1,2,4,%d" % (os.cpu_count() or 1),
+                        help="comma separated numbers of processes "\
+                             "[default: %default]")
+    (options, args) = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workspace:
+        paths = prepare_workspace(workspace, options.copies)
+        print("Decoding %d files, %d CPUs available" %\
+              (len(paths), os.cpu_count() or 1))
+        print("%6s %10s %8s %10s" % ("JOBS", "TIME [s]", "SPEEDUP", "IDENTICAL"))
+        reference, serial_time = None, None
+        for jobs in sorted(set(int(j) for j in options.jobs.split(","))):
+            start = time.perf_counter()
+            decoded = decode_files(paths, jobs)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference, serial_time = decoded, elapsed
+            print("%6d %10.3f %8.2f %10s" % (jobs, elapsed,
+                                             serial_time / elapsed,
+                                             decoded == reference))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of plot rendering. Plots of Poland and of every province are
+    rendered from bundled data by one process and by one process per CPU,
+    render time of every plot and wall time of the whole run are reported."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "24th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import datetime
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from history import Covid19HistoryContainer
+from indicators import PLOT_INDICATORS, lookback
+from plot import PLOT_MODES, plot_summary_data
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--from_date=YYYY-MM-DD] "\
+                                            "[--jobs=N] [--mode=MODE]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--from_date", action="store", dest="from_date",
+                        default="2020-12-01",
+                        help="first plotted day [default: %default]")
+    parser.add_option(  "--jobs", action="store", type="int", dest="jobs",
+                        default=os.cpu_count() or 1,
+                        help="number of rendering processes "\
+                             "[default: %default]")
+    parser.add_option(  "--mode", action="store", type="choice",
+                        choices=PLOT_MODES, dest="mode", default="auto",
+                        help="plot mode, one of %s [default: %%default]" %\
+                             ", ".join(PLOT_MODES))
+    (options, args) = parser.parse_args()
+
+    from_date = datetime.datetime.strptime(options.from_date,
+                                           "%Y-%m-%d").date()
+    history = Covid19HistoryContainer()
+    history.load_data_from_files(os.path.join(BASE_DIR, "covid19pl", "data"),
+                                 use_cache=False,
+                                 date_from=from_date - datetime.timedelta(
+                                            days=lookback(PLOT_INDICATORS)))
+    data = { loc: values[values["date"] >= from_date] for loc, values in
+             history.get_data_to_analyse(PLOT_INDICATORS).items() }
+    print("%-6s %6s %12s %12s %12s" % ("JOBS", "PLOTS", "WALL [s]",
+                                       "SUM [s]", "SLOWEST [s]"))
+    for jobs in sorted({1, options.jobs}):
+        with tempfile.TemporaryDirectory() as workspace:
+            stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+            start = time.perf_counter()
+            times = plot_summary_data(data, workspace, jobs,
+                                      mode=options.mode)
+            wall = time.perf_counter() - start
+            sys.stdout.close()
+            sys.stdout = stdout
+        print("%-6d %6d %12.3f %12.3f %12.3f" % (jobs, len(times), wall,
+                                                 sum(times.values()),
+                                                 max(times.values())))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Benchmark of covid19pl.py startup. Every flag combination is run in a
+    copy of bundled data under 'python -X importtime', time spent importing
+    modules and whole run time are reported. Exits with status 1 when a run
+    imports a module it does not use, or its import time exceeds a limit."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "22nd December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT = os.path.join(BASE_DIR, "covid19pl", "covid19pl.py")
+
+# Flag combinations with modules they must not import
+RUNS = [
+    ("--gather",            ["--gather"],
+                            ["pandas", "matplotlib", "bs4", "dotenv",
+                             "asyncio"]),
+    ("--backfill",          ["--backfill=2020-03-03..2020-03-03"],
+                            ["pandas", "matplotlib", "bs4", "dotenv"]),
+    ("--display",           ["--display"],
+                            ["matplotlib", "bs4", "asyncio"]),
+    ("--email",             ["--email=nobody@example.com"],
+                            ["matplotlib", "bs4", "asyncio"]),
+    ("--plot",              ["--plot", "--plot_from_date=2020-12-01"],
+                            ["bs4", "asyncio", "dotenv"]),
+    ("--display --plot",    ["--display", "--plot",
+                             "--plot_from_date=2020-12-01"],
+                            ["bs4", "asyncio", "dotenv"]),
+]
+
+
+def parse_importtime(stderr:str) -> dict:
+    """ Return cumulative import time in microseconds of every module """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below the module importing them
+        modules[name[1:].rstrip()] = int(cumulative)
+    return modules
+
+
+def run(args:list, workspace:str, env:dict) -> tuple:
+    """ Run the script, return wall time in seconds and import times """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", SCRIPT,
+                           "--workspace=%s" % workspace] + args,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          env=env, universal_newlines=True)
+    return time.perf_counter() - start, parse_importtime(proc.stderr)
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog [--repeat=N] "\
+                                            "[--limit=MS]",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--repeat", action="store", type="int", dest="repeat",
+                        default=3, help="number of repetitions [default: %default]")
+    parser.add_option(  "--limit", action="store", type="float", dest="limit",
+                        help="maximal import time of a run in milliseconds")
+    (options, args) = parser.parse_args()
+
+    data_dir = os.path.join(BASE_DIR, "covid19pl", "data")
+    # Connections go to a closed local port, so gathering fails at once
+    # instead of downloading data, and no email is sent.
+    env = { k: v for k, v in os.environ.items()
+            if not k.startswith("EMAIL_SMTP_") }
+    env.update({"https_proxy": "http://127.0.0.1:9",
+                "http_proxy": "http://127.0.0.1:9"})
+    failures = []
+    print("%-20s %8s %12s %12s  %s" % ("FLAGS", "MODULES", "IMPORT [ms]",
+                                        "RUN [s]", "HEAVY MODULES"))
+    with tempfile.TemporaryDirectory() as workspace:
+        for f in os.listdir(data_dir):
+            if "COVID19" in f:
+                shutil.copy2(os.path.join(data_dir, f), workspace)
+        env_file = os.path.join(workspace, ".env")
+        open(env_file, 'w').close()
+        # Warm up caches of data files, all runs start from the same state
+        run(["--display"], workspace, env)
+        for name, args, forbidden in RUNS:
+            if "--email=nobody@example.com" in args:
+                args = args + ["--env=%s" % env_file]
+            best = None
+            for _ in range(options.repeat):
+                wall, modules = run(args, workspace, env)
+                imports = sum(t for m, t in modules.items()
+                              if not m.startswith(" "))
+                if best is None or imports < best[1]:
+                    best = (wall, imports, modules)
+            wall, imports, modules = best
+            names = { m.strip() for m in modules }
+            heavy = [ m for m in ["numpy", "pandas", "matplotlib", "bs4",
+                                  "dotenv", "asyncio"] if m in names ]
+            print("%-20s %8d %12.1f %12.3f  %s" % (name, len(modules),
+                                                  imports / 1000, wall,
+                                                  " ".join(heavy)))
+            for m in forbidden:
+                if m in names:
+                    failures.append("%s imports %s" % (name, m))
+            if options.limit and imports / 1000 > options.limit:
+                failures.append("%s imports for %.1f ms, limit is %.1f ms" %\
+                                (name, imports / 1000, options.limit))
+    for failure in failures:
+        print("REGRESSION: %s" % (failure, ))
+    sys.exit(1 if failures else 0)
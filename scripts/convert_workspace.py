@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" One-shot converter of all data files in a workspace into given format.
+    Every converted file is decoded back and compared with the original
+    before the original is removed."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "19th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+import logging
+import optparse
+import os
+import sys
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BASE_DIR, "covid19pl"))
+from serializers import SNAPSHOT_FORMATS, CovidFastDecoder, columns_to_library,\
+                        dumps_columns, dumps_snapshot, loads_snapshot
+
+
+def file_format(f_name:str) -> str:
+    """ Return format of a data file judging by its extension """
+    # Longest extension first, ".json.gz" also ends with ".json"
+    for fmt, ext in sorted(SNAPSHOT_FORMATS.items(), key=lambda e: -len(e[1])):
+        if f_name.endswith(ext):
+            return fmt
+    raise ValueError("Unknown format of data file %s" % (f_name, ))
+
+
+def convert(path:str, fmt:str, decoder:CovidFastDecoder) -> str:
+    """ Convert data file into format, return path of the new file """
+    logger = logging.getLogger(__name__)
+    with open(path, 'rb') as f:
+        columns = loads_snapshot(f.read(), decoder)
+    if fmt == "jsonz":
+        content = dumps_columns(columns)
+    else:
+        content = dumps_snapshot(columns_to_library(columns), fmt)
+    if loads_snapshot(content, decoder) != columns:
+        raise ValueError("Converted %s does not match the original" % (path, ))
+    name = os.path.basename(path)
+    name = name[:-len(SNAPSHOT_FORMATS[file_format(name)])] +\
+           SNAPSHOT_FORMATS[fmt]
+    new_path = os.path.join(os.path.dirname(path), name)
+    with open(new_path + ".tmp", 'wb') as f:
+        f.write(content)
+    os.replace(new_path + ".tmp", new_path)
+    os.remove(path)
+    logger.info("Converted %s into %s" % (path, new_path))
+    return new_path
+
+
+if __name__ == "__main__":
+    parser = optparse.OptionParser( usage = "%prog --workspace=<PATH> "\
+                                            "--format=FMT",
+                                    version = "%prog {}".format(__version__),
+                                    epilog = "{}, {}".format(__copyright__,
+                                                             __license__))
+    parser.add_option(  "--format", action="store", type="choice",
+                        choices=list(SNAPSHOT_FORMATS), dest="fmt",
+                        default="jsonz",
+                        help="target format of data files [default: %default]")
+    parser.add_option(  "--workspace", action="store", dest="workspace",
+                        help="path to directory with data")
+    (options, args) = parser.parse_args()
+    if not options.workspace or not os.path.isdir(options.workspace):
+        parser.error("Data directory does not exist or was not provided.")
+    logging.basicConfig(level=logging.WARNING)
+
+    decoder = CovidFastDecoder()
+    converted, size_before, size_after = 0, 0, 0
+    for f_name in sorted(os.listdir(options.workspace)):
+        path = os.path.join(options.workspace, f_name)
+        if "COVID19" not in f_name or file_format(f_name) == options.fmt:
+            continue
+        size_before += os.path.getsize(path)
+        size_after += os.path.getsize(convert(path, options.fmt, decoder))
+        converted += 1
+    print("Converted %d files, %d bytes into %d bytes" % (converted,
+                                                          size_before,
+                                                          size_after))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+""" Local HTTP server standing in for gov.pl in benchmarks and offline
+    runs. Serves fixtures from memory and records headers of every request."""
+
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "15th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+__version__     = "1.0.0"
+
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class HttpStandIn(object):
+    """ HTTP server on a random local port serving registered fixtures.
+
+    Use as a context manager. Headers of all received requests are kept
+    in 'requests' as (path, headers) tuples, addresses of clients in
+    'connections'. Every response is delayed by 'latency' seconds.
+    Conditional requests matching ETag or Last-Modified header of a fixture
+    are answered with 304.
+    """
+
+    CHUNK_SIZE = 16 * 1024
+
+    def __init__(self, latency:float=0.0) -> None:
+        self.latency = latency
+        self.fixtures: Dict[str, Tuple[int, bytes, Dict[str, str]]] = {}
+        self.failures: Dict[str, int] = {}
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self.connections: Set[Tuple[str, int]] = set()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def add(self, path:str, body:bytes, headers:Optional[Dict[str, str]]=None,
+                  status:int=200, failures:int=0) -> None:
+        """ Serve body with given headers and status under path.
+
+        First 'failures' requests of the path are answered with 503.
+        """
+        self.fixtures[path] = (status, body, dict(headers or {}))
+        self.failures[path] = failures
+
+    def url(self, path:str) -> str:
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d%s" % (host, port, path)
+
+    @staticmethod
+    def _not_modified(request:Dict[str, str],
+                      headers:Dict[str, str]) -> bool:
+        """ Check whether conditional request matches fixture validators """
+        if "If-None-Match" in request:
+            return request["If-None-Match"] == headers.get("ETag")
+        return "If-Modified-Since" in request and\
+               request["If-Modified-Since"] == headers.get("Last-Modified")
+
+    def _handler(self) -> type:
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                standin.requests.append((self.path, dict(self.headers)))
+                standin.connections.add(self.client_address)
+                time.sleep(standin.latency)
+                status, body, headers = standin.fixtures.get(
+                                            self.path, (404, b"", {}))
+                if standin.failures.get(self.path, 0) > 0:
+                    standin.failures[self.path] -= 1
+                    status, body, headers = 503, b"", {}
+                if status == 200 and standin._not_modified(self.headers,
+                                                           headers):
+                    status, body = 304, b""
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    # Send body in pieces, as a real server would do
+                    for i in range(0, len(body), standin.CHUNK_SIZE):
+                        self.wfile.write(body[i:i+standin.CHUNK_SIZE])
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client got what it needed and closed connection
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "HttpStandIn":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "28th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import os
+import sys
+
+# Modules import their siblings by name, as they are run from covid19pl
+# directory, and tests use the local HTTP stand-in from scripts directory.
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for directory in ["scripts", "covid19pl"]:
+    path = os.path.join(BASE_DIR, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
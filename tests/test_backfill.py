@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "28th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from datetime import date
+import logging
+import os
+import tempfile
+import unittest
+
+from bench_crawler import make_page
+from crawler import Covid19DataCrawler
+from fetch import AsyncFetchEngine
+from http_standin import HttpStandIn
+
+PAGE_HEADERS = {"Content-Type": "text/html; charset=utf-8"}
+
+
+class BackfillTest(unittest.TestCase):
+    """ Backfilling days from archive like server served by local stand-in """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.server = HttpStandIn().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        self.workspace = workspace.name
+        self.crawler = Covid19DataCrawler(
+                            archive_url=self.server.url(
+                                        "/web/{date:%Y%m%d}235959id_/gov"),
+                            engine=AsyncFetchEngine(rate=1000, backoff=0.01))
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def snapshot(self, path:str, rows:int=380, location:str="") -> None:
+        if location:
+            self.server.add(path, b"", {"Location": location}, status=302)
+        else:
+            self.server.add(path, make_page(20 * 1024, rows), PAGE_HEADERS)
+
+    def data_files(self) -> list:
+        return sorted(os.listdir(self.workspace))
+
+    def test_closest_snapshot_of_the_same_day_is_saved(self) -> None:
+        self.snapshot("/web/20201201235959id_/gov")
+        self.snapshot("/web/20201202235959id_/gov",
+                      location="/web/20201202101500id_/gov")
+        self.snapshot("/web/20201202101500id_/gov", 381)
+        saved = self.crawler.backfill(date(2020, 12, 1), date(2020, 12, 2),
+                                      self.workspace)
+        self.assertEqual(saved, [date(2020, 12, 1), date(2020, 12, 2)])
+        self.assertEqual(self.data_files(), ["COVID19_PL_2020-12-01.json",
+                                             "COVID19_PL_2020-12-02.json"])
+
+    def test_snapshot_of_another_day_is_skipped(self) -> None:
+        self.snapshot("/web/20201203235959id_/gov",
+                      location="/web/20201120080000id_/gov")
+        self.snapshot("/web/20201120080000id_/gov")
+        self.snapshot("/web/20201204235959id_/gov",
+                      location="/web/20201205000100id_/gov")
+        self.snapshot("/web/20201205000100id_/gov")
+        saved = self.crawler.backfill(date(2020, 12, 3), date(2020, 12, 4),
+                                      self.workspace)
+        self.assertEqual(saved, [])
+        self.assertEqual(self.data_files(), [])
+
+    def test_days_in_workspace_are_not_fetched(self) -> None:
+        open(os.path.join(self.workspace, "COVID19_PL_2020-12-01.json"),
+             'w').close()
+        self.snapshot("/web/20201202235959id_/gov")
+        saved = self.crawler.backfill(date(2020, 12, 1), date(2020, 12, 2),
+                                      self.workspace)
+        self.assertEqual(saved, [date(2020, 12, 2)])
+        self.assertEqual([p for p, _ in self.server.requests],
+                         ["/web/20201202235959id_/gov"])
+
+    def test_failed_days_are_skipped(self) -> None:
+        self.snapshot("/web/20201201235959id_/gov")
+        self.snapshot("/web/20201202235959id_/gov",
+                      location="/web/20201202235959id_/gov")
+        saved = self.crawler.backfill(date(2020, 12, 1), date(2020, 12, 3),
+                                      self.workspace)
+        self.assertEqual(saved, [date(2020, 12, 1)])
+        self.assertEqual(self.data_files(), ["COVID19_PL_2020-12-01.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "28th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import asyncio
+import http.client
+import logging
+import socket
+import time
+import unittest
+
+from fetch import AsyncFetchEngine
+from http_standin import HttpStandIn
+
+
+def fetch(engine:AsyncFetchEngine, urls:list) -> list:
+    """ Fetch URLs with the engine, return results in order of URLs """
+    async def run() -> list:
+        async with engine:
+            return await engine.fetch_all(urls)
+    return asyncio.run(run())
+
+
+def closed_port_url() -> str:
+    """ Return URL of local port nobody listens on """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return "http://127.0.0.1:%d/" % (port, )
+
+
+class AsyncFetchEngineTest(unittest.TestCase):
+    """ Fetching pages served by local stand-in """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.server = self.standin()
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def standin(self, latency:float=0.0) -> HttpStandIn:
+        server = HttpStandIn(latency).__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        return server
+
+    def test_pages_in_order_of_urls(self) -> None:
+        for i in range(5):
+            self.server.add("/%d" % i, b"page %d" % i)
+        results = fetch(AsyncFetchEngine(rate=1000),
+                        [self.server.url("/%d" % i) for i in range(5)])
+        self.assertEqual([r.read() for r in results],
+                         [b"page %d" % i for i in range(5)])
+        self.assertEqual({r.status for r in results}, {200})
+
+    def test_retries_with_backoff_on_server_errors(self) -> None:
+        self.server.add("/page", b"page", failures=2)
+        engine = AsyncFetchEngine(rate=1000, retries=3, backoff=0.1)
+        start = time.perf_counter()
+        response, = fetch(engine, [self.server.url("/page")])
+        elapsed = time.perf_counter() - start
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), b"page")
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(engine.retried, 2)
+        # Backoff of 0.1s doubled after first retry
+        self.assertGreaterEqual(elapsed, 0.3)
+
+    def test_last_server_error_returned_when_retries_exhausted(self) -> None:
+        self.server.add("/page", b"page", failures=5)
+        engine = AsyncFetchEngine(rate=1000, retries=2, backoff=0.01)
+        response, = fetch(engine, [self.server.url("/page")])
+        self.assertEqual(response.status, 503)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(engine.retried, 2)
+
+    def test_retries_on_connection_errors(self) -> None:
+        engine = AsyncFetchEngine(rate=1000, retries=2, backoff=0.05)
+        start = time.perf_counter()
+        error, = fetch(engine, [closed_port_url()])
+        elapsed = time.perf_counter() - start
+        self.assertIsInstance(error, ConnectionError)
+        self.assertEqual(engine.retried, 2)
+        self.assertEqual(engine.requests, 0)
+        self.assertGreaterEqual(elapsed, 0.15)
+
+    def test_client_errors_are_not_retried(self) -> None:
+        engine = AsyncFetchEngine(rate=1000, backoff=0.01)
+        response, = fetch(engine, [self.server.url("/missing")])
+        self.assertEqual(response.status, 404)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(engine.retried, 0)
+
+    def test_redirects_are_followed(self) -> None:
+        hops = AsyncFetchEngine.MAX_REDIRECTS
+        for i in range(hops):
+            self.server.add("/hop/%d" % i, b"",
+                            {"Location": "/hop/%d" % (i+1)},
+                            status=302 if i % 2 else 301)
+        self.server.add("/hop/%d" % hops, b"target")
+        response, = fetch(AsyncFetchEngine(rate=1000),
+                          [self.server.url("/hop/0")])
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), b"target")
+        self.assertEqual(response.url, self.server.url("/hop/%d" % hops))
+        self.assertEqual(len(self.server.requests), hops + 1)
+
+    def test_too_many_redirects_raise(self) -> None:
+        self.server.add("/loop", b"", {"Location": "/loop"}, status=302)
+        engine = AsyncFetchEngine(rate=1000)
+        error, = fetch(engine, [self.server.url("/loop")])
+        self.assertIsInstance(error, http.client.HTTPException)
+        self.assertEqual(len(self.server.requests),
+                         AsyncFetchEngine.MAX_REDIRECTS + 1)
+
+    def test_connections_are_kept_alive(self) -> None:
+        for i in range(10):
+            self.server.add("/%d" % i, b"page %d" % i)
+        engine = AsyncFetchEngine(concurrency=1, rate=1000)
+        results = fetch(engine, [self.server.url("/%d" % i)
+                                 for i in range(10)])
+        self.assertEqual({r.status for r in results}, {200})
+        self.assertEqual(engine.requests, 10)
+        self.assertEqual(engine.connections, 1)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_requests_in_flight_are_bounded(self) -> None:
+        server = self.standin(latency=0.1)
+        for i in range(8):
+            server.add("/%d" % i, b"page %d" % i)
+        engine = AsyncFetchEngine(concurrency=2, rate=1000)
+        start = time.perf_counter()
+        results = fetch(engine, [server.url("/%d" % i) for i in range(8)])
+        elapsed = time.perf_counter() - start
+        self.assertEqual({r.status for r in results}, {200})
+        self.assertEqual(engine.connections, 2)
+        self.assertEqual(len(server.connections), 2)
+        # Four rounds of two requests
+        self.assertGreaterEqual(elapsed, 0.4)
+
+    def test_requests_to_host_are_rate_limited(self) -> None:
+        for i in range(5):
+            self.server.add("/%d" % i, b"page %d" % i)
+        engine = AsyncFetchEngine(concurrency=5, rate=10)
+        start = time.perf_counter()
+        fetch(engine, [self.server.url("/%d" % i) for i in range(5)])
+        elapsed = time.perf_counter() - start
+        # Requests are spaced by 0.1s, the first one is not delayed
+        self.assertGreaterEqual(elapsed, 0.4)
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_invalid_limits(self) -> None:
+        with self.assertRaises(ValueError):
+            AsyncFetchEngine(concurrency=0)
+        with self.assertRaises(ValueError):
+            AsyncFetchEngine(rate=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "29th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import contextlib
+import io
+import logging
+import tempfile
+import unittest
+
+from history import Covid19HistoryContainer
+import utils
+
+
+class EmptyWorkspaceTest(unittest.TestCase):
+    """ History of a workspace without any data file """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        self.workspace = workspace.name
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def test_load_data_from_files(self) -> None:
+        for use_cache in [True, False]:
+            history = Covid19HistoryContainer()
+            history.load_data_from_files(self.workspace, use_cache=use_cache)
+            self.assertEqual(len(history.get_cube().dates), 0)
+            self.assertEqual(history.get_data_to_analyse(), {})
+
+    def test_summary_is_empty(self) -> None:
+        for load in ["load_data_from_files", "load_latest_from_files"]:
+            history = Covid19HistoryContainer()
+            getattr(history, load)(self.workspace)
+            summary = history.get_summary()
+            self.assertTrue(summary.empty)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                utils.display_todays_stats_for_all_locations(summary)
+            self.assertEqual(len(output.getvalue().splitlines()), 1)
+            self.assertTrue(output.getvalue().startswith("Location"))
+
+
+if __name__ == "__main__":
+    unittest.main()
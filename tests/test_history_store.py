@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "28th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+from datetime import date
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from history import Covid19HistoryContainer
+from store import HistoryStore
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "covid19pl", "data")
+
+
+class HistoryStoreTest(unittest.TestCase):
+    """ History store kept in step with data files of a workspace """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        self.workspace = workspace.name
+        self.add("2020-12-01", "2020-12-31")
+        Covid19HistoryContainer().load_data_from_files(self.workspace)
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def add(self, first:str, last:str) -> None:
+        """ Copy bundled data files of days from first to last """
+        for f in os.listdir(DATA_DIR):
+            if f.startswith("COVID19_PL_") and first <= f[11:21] <= last:
+                shutil.copy2(os.path.join(DATA_DIR, f), self.workspace)
+
+    def assertSameAsFiles(self, **kwargs) -> None:
+        stored = Covid19HistoryContainer()
+        stored.load_data_from_store(self.workspace, **kwargs)
+        decoded = Covid19HistoryContainer()
+        decoded.load_data_from_files(self.workspace, use_cache=False, **kwargs)
+        stored, decoded = stored.get_data_to_analyse(),\
+                          decoded.get_data_to_analyse()
+        self.assertEqual(stored.keys(), decoded.keys())
+        for loc in decoded:
+            self.assertTrue(stored[loc].equals(decoded[loc]), loc)
+
+    def test_store_of_whole_history(self) -> None:
+        self.assertSameAsFiles()
+        self.assertSameAsFiles(date_from=date(2020, 12, 20))
+
+    def test_outdated_store_is_refused(self) -> None:
+        self.add("2021-01-01", "2021-01-05")
+        with self.assertRaises(ValueError):
+            Covid19HistoryContainer().load_data_from_store(self.workspace)
+        os.remove(os.path.join(self.workspace, "COVID19_PL_2021-01-05.json"))
+        os.remove(os.path.join(self.workspace, "COVID19_PL_2020-12-31.json"))
+        with self.assertRaises(ValueError):
+            Covid19HistoryContainer().load_data_from_store(self.workspace)
+
+    def test_latest_load_appends_to_store(self) -> None:
+        self.add("2021-01-01", "2021-01-05")
+        Covid19HistoryContainer().load_latest_from_files(self.workspace)
+        self.assertSameAsFiles()
+
+    def test_range_load_appends_to_store(self) -> None:
+        self.add("2021-01-01", "2021-01-19")
+        Covid19HistoryContainer().load_data_from_files(self.workspace,
+                                                date_from=date(2021, 1, 10))
+        self.assertSameAsFiles()
+        self.assertSameAsFiles(date_from=date(2021, 1, 10))
+
+    def test_store_grows_beyond_capacity(self) -> None:
+        capacity = HistoryStore.MIN_CAPACITY
+        self.addCleanup(setattr, HistoryStore, "MIN_CAPACITY", capacity)
+        HistoryStore.MIN_CAPACITY = 32
+        shutil.rmtree(self.workspace)
+        os.mkdir(self.workspace)
+        self.add("2020-12-01", "2020-12-31")
+        Covid19HistoryContainer().load_data_from_files(self.workspace)
+        self.add("2021-01-01", "2021-01-19")
+        Covid19HistoryContainer().load_latest_from_files(self.workspace)
+        self.assertSameAsFiles()
+
+    def test_backfilled_day_leaves_store_outdated(self) -> None:
+        self.add("2021-01-01", "2021-01-10")
+        os.remove(os.path.join(self.workspace, "COVID19_PL_2021-01-03.json"))
+        Covid19HistoryContainer().load_latest_from_files(self.workspace)
+        self.assertSameAsFiles()
+        # Day older than stored days, but from loaded range
+        self.add("2021-01-03", "2021-01-03")
+        Covid19HistoryContainer().load_data_from_files(self.workspace,
+                                                date_from=date(2021, 1, 2))
+        with self.assertRaises(ValueError):
+            Covid19HistoryContainer().load_data_from_store(self.workspace)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: 'utf-8' -*-
+
+__author__      = "oscarsierraproject.eu"
+__copyright__   = "Copyright 2020, oscarsierraproject.eu"
+__license__     = "GNU General Public License 3.0"
+__date__        = "28th December 2020"
+__maintainer__  = "oscarsierraproject.eu"
+__email__       = "oscarsierraproject@protonmail.com"
+__status__      = "Development"
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from bench_crawler import make_page
+from crawler import Covid19DataCrawler, ResponseCache
+from http_standin import HttpStandIn
+
+PAGE_HEADERS = {"Content-Type": "text/html; charset=utf-8"}
+LAST_MODIFIED = "Mon, 28 Dec 2020 10:00:00 GMT"
+
+
+class ConditionalRequestTest(unittest.TestCase):
+    """ Polling gov.pl like page served by local stand-in with cache """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.server = HttpStandIn().__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        self.workspace = workspace.name
+        self.url = self.server.url("/koronawirus")
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def serve(self, rows:int, headers:dict) -> None:
+        self.server.add("/koronawirus", make_page(20 * 1024, rows),
+                        dict(PAGE_HEADERS, **headers))
+
+    def poll(self) -> Covid19DataCrawler:
+        """ Poll the page once with response cache in workspace """
+        crawler = Covid19DataCrawler(self.url, cache_dir=self.workspace)
+        crawler.save_data_in_file(self.workspace)
+        return crawler
+
+    def data_files(self) -> list:
+        return [ f for f in os.listdir(self.workspace)
+                 if f.startswith("COVID19") ]
+
+    def cached(self) -> dict:
+        with open(os.path.join(self.workspace, ResponseCache.FILE_NAME)) as f:
+            return json.load(f)["urls"][self.url]
+
+    def last_request(self) -> dict:
+        return self.server.requests[-1][1]
+
+    def test_first_request_is_unconditional(self) -> None:
+        self.serve(380, {"ETag": '"v1"', "Last-Modified": LAST_MODIFIED})
+        self.poll()
+        self.assertNotIn("If-None-Match", self.last_request())
+        self.assertNotIn("If-Modified-Since", self.last_request())
+        self.assertEqual(len(self.data_files()), 1)
+        self.assertEqual(self.cached()["etag"], '"v1"')
+        self.assertEqual(self.cached()["last_modified"], LAST_MODIFIED)
+
+    def test_validators_are_sent_from_cache_file(self) -> None:
+        self.serve(380, {"ETag": '"v1"', "Last-Modified": LAST_MODIFIED})
+        self.poll()
+        self.poll()
+        self.assertEqual(self.last_request()["If-None-Match"], '"v1"')
+        self.assertEqual(self.last_request()["If-Modified-Since"],
+                         LAST_MODIFIED)
+
+    def test_last_modified_only(self) -> None:
+        self.serve(380, {"Last-Modified": LAST_MODIFIED})
+        self.poll()
+        for f in self.data_files():
+            os.remove(os.path.join(self.workspace, f))
+        self.poll()
+        self.assertNotIn("If-None-Match", self.last_request())
+        self.assertEqual(self.last_request()["If-Modified-Since"],
+                         LAST_MODIFIED)
+        self.assertEqual(self.data_files(), [])
+
+    def test_not_modified_is_neither_parsed_nor_saved(self) -> None:
+        self.serve(380, {"ETag": '"v1"'})
+        self.poll()
+        for f in self.data_files():
+            os.remove(os.path.join(self.workspace, f))
+        with mock.patch.object(Covid19DataCrawler, "read_register_data")\
+                                                                    as read,\
+             mock.patch.object(Covid19DataCrawler, "_write_library")\
+                                                                    as write:
+            self.poll()
+        read.assert_not_called()
+        write.assert_not_called()
+        self.assertEqual(self.data_files(), [])
+        self.assertEqual(self.cached()["etag"], '"v1"')
+
+    def test_changed_etag_updates_cache(self) -> None:
+        self.serve(380, {"ETag": '"v1"'})
+        self.poll()
+        sha256 = self.cached()["sha256"]
+        for f in self.data_files():
+            os.remove(os.path.join(self.workspace, f))
+        self.serve(381, {"ETag": '"v2"'})
+        self.poll()
+        self.assertEqual(self.last_request()["If-None-Match"], '"v1"')
+        self.assertEqual(len(self.data_files()), 1)
+        self.assertEqual(self.cached()["etag"], '"v2"')
+        self.assertNotEqual(self.cached()["sha256"], sha256)
+        self.poll()
+        self.assertEqual(self.last_request()["If-None-Match"], '"v2"')
+
+    def test_changed_etag_with_same_data_is_not_saved(self) -> None:
+        self.serve(380, {"ETag": '"v1"'})
+        self.poll()
+        for f in self.data_files():
+            os.remove(os.path.join(self.workspace, f))
+        self.serve(380, {"ETag": '"v2"'})
+        self.poll()
+        self.assertEqual(self.data_files(), [])
+        self.assertEqual(self.cached()["etag"], '"v2"')
+
+    def test_without_cache_requests_are_unconditional(self) -> None:
+        self.serve(380, {"ETag": '"v1"'})
+        for _ in range(2):
+            Covid19DataCrawler(self.url).save_data_in_file(self.workspace)
+            self.assertNotIn("If-None-Match", self.last_request())
+        self.assertFalse(os.path.isfile(os.path.join(self.workspace,
+                                                     ResponseCache.FILE_NAME)))
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """ Validators kept in cache file """
+
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(workspace.cleanup)
+        self.workspace = workspace.name
+
+    def tearDown(self) -> None:
+        logging.disable(logging.NOTSET)
+
+    def test_entries_survive_reopening(self) -> None:
+        ResponseCache(self.workspace).update("http://a", {"etag": '"x"'})
+        cache = ResponseCache(self.workspace)
+        self.assertEqual(cache.conditional_headers("http://a"),
+                         {"If-None-Match": '"x"'})
+        self.assertEqual(cache.conditional_headers("http://b"), {})
+
+    def test_corrupted_file_is_dropped(self) -> None:
+        with open(os.path.join(self.workspace, ResponseCache.FILE_NAME),
+                  'w') as f:
+            f.write("{")
+        self.assertEqual(ResponseCache(self.workspace).get("http://a"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()